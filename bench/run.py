@@ -0,0 +1,182 @@
+import argparse
+import json
+import os
+import tempfile
+import time
+
+import pandas as pd
+from sqlalchemy import create_engine
+
+from bench.synthetic import generate
+from logomis.budgets import invalidate_budgets, load_budgets, merge_budgets
+from logomis.categories import ADDITIONAL_CATEGORIES, EXPENDITURE_CATEGORIES, REVENUE_CATEGORIES, TOTAL_GROUPS
+from logomis.data import read_frame
+from logomis.dtypes import compact_details, frame_bytes
+from logomis.filters import FilterIndex
+from logomis.pivot import category_rows, pivot_categories
+from logomis.queries import actuals_query, details_query
+from logomis.report import Total
+from logomis.totals import group_totals
+from logomis.ytd import YTD_GROUP_COLUMNS, add_ytd_columns
+
+# Usage, from the repository root:
+#
+#   python -m bench.run --authorities 300 3000 --years 10
+#
+# The synthetic databases are generated on first use and reused afterwards.
+TABLES = [
+    ('revenue', 'revenue', REVENUE_CATEGORIES),
+    ('expenditure', 'expenditure', EXPENDITURE_CATEGORIES),
+    ('additional', 'revenue', ADDITIONAL_CATEGORIES),
+]
+
+
+# Run fn `repeat` times and return its last result and the fastest time
+def timed(fn, repeat):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+# Time each stage of the report pages' pipeline against one database: the
+# actuals query, annual budget load and budget merge, pivot, group totals,
+# year-to-date cumulative sums and filtering. The old query with the budgets
+# joined in, chained column additions, per-column cumsum and boolean-mask
+# filter are timed alongside for comparison.
+def run_stages(engine, repeat=3):
+    results = []
+
+    def record(page, stage, seconds, df=None):
+        results.append({
+            'page': page,
+            'stage': stage,
+            'seconds': round(seconds, 4),
+            'rows': None if df is None else len(df),
+            'bytes': None if df is None else frame_bytes(df),
+        })
+
+    query, params = actuals_query()
+    raw, seconds = timed(lambda: pd.read_sql_query(query, engine, params=params), repeat)
+    record('both', 'actuals query', seconds, raw)
+    actuals, seconds = timed(lambda: compact_details(raw), repeat)
+    record('both', 'compact dtypes', seconds, actuals)
+    streamed, seconds = timed(lambda: read_frame(query, engine, params, chunk_size=50000, transform=compact_details), repeat)
+    record('both', 'query + compact (streamed)', seconds, streamed)
+
+    # The budget cache is emptied before each run so every run reads them
+    years = actuals['year'].unique()
+
+    def read_budgets():
+        invalidate_budgets()
+        return load_budgets(engine, years)
+
+    budgets, seconds = timed(read_budgets, repeat)
+    record('both', 'annual budgets', seconds, budgets)
+    details, seconds = timed(lambda: merge_budgets(actuals, budgets), repeat)
+    record('both', 'budget merge', seconds, details)
+
+    joined_query, joined_params = details_query()
+    joined, seconds = timed(lambda: pd.read_sql_query(joined_query, engine, params=joined_params), repeat)
+    record('both', 'query (joined budgets)', seconds, joined)
+
+    tables = {}
+    for name, kind, categories in TABLES:
+        tables[name], seconds = timed(lambda: pivot_categories(category_rows(details, kind), categories), repeat)
+        record('both', f'pivot {name}', seconds, tables[name])
+
+    for name, _, categories in TABLES[:2]:
+        df = tables[name].fillna(0)
+        totals = [Total(group, f'{group} budget', f'{group} actual') for group in TOTAL_GROUPS]
+        result, seconds = timed(lambda: group_totals(df, categories, totals), repeat)
+        record('both', f'totals {name} (matrix)', seconds, result)
+
+        def chained():
+            result = df.copy()
+            for total in totals:
+                group = [category for category in categories if category.group == total.group]
+                result[total.budget] = df[group[0].budget]
+                result[total.actual] = df[group[0].actual]
+                for category in group[1:]:
+                    result[total.budget] = result[total.budget] + df[category.budget]
+                    result[total.actual] = result[total.actual] + df[category.actual]
+            return result[[column for total in totals for column in (total.budget, total.actual)]]
+
+        result, seconds = timed(chained, repeat)
+        record('both', f'totals {name} (chained adds)', seconds, result)
+
+    year, month = int(details['year'].max()), 6
+    for name, _, categories in TABLES:
+        df = tables[name]
+        index, seconds = timed(lambda: FilterIndex(df), repeat)
+        record('this month', f'filter index {name}', seconds)
+        selected, seconds = timed(lambda: index.select(df, year, month), repeat)
+        record('this month', f'filter {name} (index)', seconds, selected)
+        selected, seconds = timed(lambda: df[(df['year'] == year) & (df['month'] == month)], repeat)
+        record('this month', f'filter {name} (mask)', seconds, selected)
+
+    for name, _, categories in TABLES:
+        df = tables[name].sort_values(YTD_GROUP_COLUMNS + ['month'])
+        columns = [category.actual for category in categories]
+        ytd, seconds = timed(lambda: add_ytd_columns(df, columns, ' (upto this month)'), repeat)
+        record('upto this month', f'cumsum {name}', seconds, ytd)
+
+        def per_column():
+            result = df.copy()
+            for column in columns:
+                result[column + ' (upto this month)'] = result.groupby(YTD_GROUP_COLUMNS, observed=True)[column].cumsum()
+            return result
+
+        ytd, seconds = timed(per_column, repeat)
+        record('upto this month', f'cumsum {name} (per column)', seconds, ytd)
+
+    return results
+
+
+def print_results(label, results):
+    print(f'\n{label}')
+    print(f"{'page':<18}{'stage':<34}{'seconds':>10}{'rows':>12}{'MiB':>10}")
+    for row in results:
+        rows = '' if row['rows'] is None else row['rows']
+        size = '' if row['bytes'] is None else f"{row['bytes'] / 2 ** 20:.1f}"
+        print(f"{row['page']:<18}{row['stage']:<34}{row['seconds']:>10.4f}{rows:>12}{size:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the report pipeline on synthetic data.')
+    parser.add_argument('--authorities', type=int, nargs='+', default=[300, 3000])
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--fill', type=float, default=0.8)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'logomis-bench'))
+    parser.add_argument('--regenerate', action='store_true', help='rebuild the synthetic databases')
+    parser.add_argument('--json', help='also write the results to this file')
+    args = parser.parse_args(argv)
+
+    os.makedirs(args.data_dir, exist_ok=True)
+    report = {}
+    for authorities in args.authorities:
+        path = os.path.join(args.data_dir, f'lg_{authorities}x{args.years}_{args.fill}.db')
+        if args.regenerate or not os.path.exists(path):
+            _, seconds = timed(lambda: generate(path, authorities, args.years, fill=args.fill), 1)
+            print(f'Generated {path} in {seconds:.1f}s')
+
+        engine = create_engine(f'sqlite:///{path}')
+        results = run_stages(engine, repeat=args.repeat)
+        engine.dispose()
+
+        label = f'{authorities} authorities x {args.years} years'
+        print_results(label, results)
+        report[label] = results
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,132 @@
+import argparse
+import os
+import sqlite3
+
+import numpy as np
+
+from logomis.categories import ADDITIONAL_CATEGORIES, EXPENDITURE_CATEGORIES, REVENUE_CATEGORIES
+
+# Synthetic copy of the local government schema the report pages read, at a
+# configurable scale, written to SQLite so the pages' pipeline can be timed
+# without a MySQL server.
+SCHEMA = '''
+CREATE TABLE provinces (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE districts (id INTEGER PRIMARY KEY, name TEXT NOT NULL, province_id INTEGER NOT NULL);
+CREATE TABLE local_authorities (id INTEGER PRIMARY KEY, name TEXT NOT NULL, district_id INTEGER NOT NULL);
+CREATE TABLE revenues (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE expenditures (id INTEGER PRIMARY KEY, name TEXT NOT NULL);
+CREATE TABLE actual_budgets (id INTEGER PRIMARY KEY, local_authority_id INTEGER NOT NULL, year INTEGER NOT NULL, month INTEGER NOT NULL);
+CREATE TABLE actual_budget_details (id INTEGER PRIMARY KEY, actual_budget_id INTEGER NOT NULL, revenue_id INTEGER, expenditure_id INTEGER, total_amount REAL);
+CREATE TABLE annual_budgets (id INTEGER PRIMARY KEY, local_authority_id INTEGER NOT NULL, year INTEGER NOT NULL);
+CREATE TABLE annual_budget_details (id INTEGER PRIMARY KEY, annual_budget_id INTEGER NOT NULL, revenue_id INTEGER, expenditure_id INTEGER, total_amount REAL);
+'''
+
+# Same indexes as migrations/001_report_indexes.sql
+INDEXES = '''
+CREATE INDEX idx_actual_budgets_year_month_la ON actual_budgets (year, month, local_authority_id);
+CREATE INDEX idx_actual_budget_details_budget_revenue ON actual_budget_details (actual_budget_id, revenue_id);
+CREATE INDEX idx_actual_budget_details_budget_expenditure ON actual_budget_details (actual_budget_id, expenditure_id);
+CREATE INDEX idx_annual_budgets_la_year ON annual_budgets (local_authority_id, year);
+CREATE INDEX idx_annual_budget_details_budget_revenue ON annual_budget_details (annual_budget_id, revenue_id);
+CREATE INDEX idx_annual_budget_details_budget_expenditure ON annual_budget_details (annual_budget_id, expenditure_id);
+CREATE INDEX idx_local_authorities_district ON local_authorities (district_id);
+CREATE INDEX idx_districts_province ON districts (province_id);
+'''
+
+PROVINCES = 9
+DISTRICTS = 25
+
+
+def _line_items(rng, parent_ids, item_ids, fill, low, high):
+    # One row per (parent, item) kept with probability `fill`; returns the
+    # parent ids, item ids and amounts as flat arrays
+    parents = np.repeat(parent_ids, len(item_ids))
+    items = np.tile(item_ids, len(parent_ids))
+    keep = rng.random(len(parents)) < fill
+    amounts = np.round(rng.uniform(low, high, keep.sum()), 2)
+    return parents[keep], items[keep], amounts
+
+
+def _insert_details(connection, table, parent_column, start_id, parents, revenue_ids, expenditure_ids, amounts):
+    ids = np.arange(start_id, start_id + len(parents))
+    rows = zip(ids.tolist(), parents.tolist(), revenue_ids, expenditure_ids, amounts.tolist())
+    connection.executemany(
+        f'INSERT INTO {table} (id, {parent_column}, revenue_id, expenditure_id, total_amount) VALUES (?, ?, ?, ?, ?)',
+        rows,
+    )
+    return start_id + len(parents)
+
+
+def _write_details(connection, table, parent_column, rng, parent_ids, fill, low, high):
+    revenue_item_ids = np.array(sorted({c.id for c in REVENUE_CATEGORIES + ADDITIONAL_CATEGORIES}))
+    expenditure_item_ids = np.array([c.id for c in EXPENDITURE_CATEGORIES])
+
+    next_id = 1
+    parents, items, amounts = _line_items(rng, parent_ids, revenue_item_ids, fill, low, high)
+    next_id = _insert_details(connection, table, parent_column, next_id, parents,
+                              items.tolist(), [None] * len(items), amounts)
+    parents, items, amounts = _line_items(rng, parent_ids, expenditure_item_ids, fill, low, high)
+    _insert_details(connection, table, parent_column, next_id, parents,
+                    [None] * len(items), items.tolist(), amounts)
+
+
+# Write a synthetic database with the given number of local authorities and
+# years of monthly actuals. `fill` is the share of (month, line item) pairs
+# that have a submitted amount.
+def generate(path, authorities=300, years=10, first_year=2015, fill=0.8, seed=0):
+    if os.path.exists(path):
+        os.remove(path)
+
+    rng = np.random.default_rng(seed)
+    connection = sqlite3.connect(path)
+    try:
+        connection.executescript(SCHEMA)
+
+        connection.executemany('INSERT INTO provinces VALUES (?, ?)',
+                               [(i, f'Province {i:02d}') for i in range(1, PROVINCES + 1)])
+        connection.executemany('INSERT INTO districts VALUES (?, ?, ?)',
+                               [(i, f'District {i:02d}', 1 + (i - 1) % PROVINCES) for i in range(1, DISTRICTS + 1)])
+        connection.executemany('INSERT INTO local_authorities VALUES (?, ?, ?)',
+                               [(i, f'Authority {i:05d}', 1 + (i - 1) % DISTRICTS) for i in range(1, authorities + 1)])
+        connection.executemany('INSERT INTO revenues VALUES (?, ?)', [(i, f'Revenue {i}') for i in range(1, 17)])
+        connection.executemany('INSERT INTO expenditures VALUES (?, ?)', [(i, f'Expenditure {i}') for i in range(1, 19)])
+
+        authority_ids = np.arange(1, authorities + 1)
+        year_values = np.arange(first_year, first_year + years)
+
+        annual_authorities = np.repeat(authority_ids, years)
+        annual_years = np.tile(year_values, authorities)
+        annual_ids = np.arange(1, len(annual_authorities) + 1)
+        connection.executemany('INSERT INTO annual_budgets VALUES (?, ?, ?)',
+                               zip(annual_ids.tolist(), annual_authorities.tolist(), annual_years.tolist()))
+        _write_details(connection, 'annual_budget_details', 'annual_budget_id', rng, annual_ids, 0.95, 10000, 5000000)
+
+        actual_authorities = np.repeat(authority_ids, years * 12)
+        actual_years = np.tile(np.repeat(year_values, 12), authorities)
+        actual_months = np.tile(np.arange(1, 13), authorities * years)
+        actual_ids = np.arange(1, len(actual_authorities) + 1)
+        connection.executemany('INSERT INTO actual_budgets VALUES (?, ?, ?, ?)',
+                               zip(actual_ids.tolist(), actual_authorities.tolist(),
+                                   actual_years.tolist(), actual_months.tolist()))
+        _write_details(connection, 'actual_budget_details', 'actual_budget_id', rng, actual_ids, fill, 0, 500000)
+
+        connection.executescript(INDEXES)
+        connection.commit()
+    finally:
+        connection.close()
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Generate a synthetic local government database in SQLite.')
+    parser.add_argument('path')
+    parser.add_argument('--authorities', type=int, default=300)
+    parser.add_argument('--years', type=int, default=10)
+    parser.add_argument('--fill', type=float, default=0.8)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    generate(args.path, args.authorities, args.years, fill=args.fill, seed=args.seed)
+
+
+if __name__ == '__main__':
+    main()
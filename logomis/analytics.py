@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+METRICS = ['Execution %', 'Variance', 'Pace %']
+
+
+# Budget line of a report table to compute metrics for: its label, e.g.
+# 'RateTaxes', and its budget and actual columns
+def budget_item(budget, actual):
+    label = budget[:-len('Budget')] if budget.endswith('Budget') else budget
+    return label.rstrip('_'), budget, actual
+
+
+def _safe_percent(numerator, denominator):
+    # NaN wherever the denominator is zero, instead of inf or a warning
+    out = np.full(numerator.shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator != 0)
+    return out * 100
+
+
+class ExecutionMetrics:
+    # Budget execution metrics of every budget line of a report table, as
+    # (rows, items) arrays aligned with the table:
+    #
+    #   Execution %  actual / budget
+    #   Variance     actual - budget
+    #   Pace %       actual / the share of the budget due by that month,
+    #                i.e. budget * months_elapsed / 12
+    #
+    # Each metric is one vectorized pass over the whole amount block. Lines
+    # with a zero budget get NaN percentages.
+
+    @timed_stage('execution metrics')
+    def __init__(self, table, items, months_elapsed):
+        self.items = list(items)
+        self.labels = [label for label, _, _ in self.items]
+        budgets = table[[budget for _, budget, _ in self.items]].to_numpy(dtype='float64')
+        actuals = table[[actual for _, _, actual in self.items]].to_numpy(dtype='float64')
+
+        due = budgets * (np.asarray(months_elapsed, dtype='float64')[:, None] / 12)
+        self.values = {
+            'Execution %': _safe_percent(actuals, budgets),
+            'Variance': actuals - budgets,
+            'Pace %': _safe_percent(actuals, due),
+        }
+
+    def column(self, metric, label):
+        return self.values[metric][:, self.labels.index(label)]
+
+
+# Positions of the n largest (or smallest) values among the given row
+# positions, best first, skipping NaN. np.argpartition finds the n in linear
+# time and only those n are sorted, instead of sorting every row.
+def top_n(values, positions, n, largest=True):
+    positions = np.asarray(positions)
+    candidates = values[positions]
+    valid = ~np.isnan(candidates)
+    positions, candidates = positions[valid], candidates[valid]
+    if largest:
+        candidates = -candidates
+
+    if n < len(candidates):
+        chosen = np.argpartition(candidates, n)[:n]
+    else:
+        chosen = np.arange(len(candidates))
+    return positions[chosen[np.argsort(candidates[chosen], kind='stable')]]
+
+
+# Ranking table for a metric of one budget line: the authorities at the
+# given positions of table with the line's budget, actual and metric value
+def ranking_frame(table, metrics, metric, label, positions):
+    _, budget, actual = metrics.items[metrics.labels.index(label)]
+    rows = table.iloc[positions][['name', 'province_name', 'district_name', budget, actual]].reset_index(drop=True)
+    rows[metric] = metrics.column(metric, label)[positions]
+    rows.index = pd.RangeIndex(1, len(rows) + 1, name='rank')
+    return rows
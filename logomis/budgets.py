@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from logomis.cache import TTLCache
+from logomis.config import get_setting
+from logomis.dtypes import DIMENSION_COLUMNS, compact_details, concat_compact
+from logomis.queries import annual_budgets_query
+from logomis.timing import stage, timed_stage
+
+# Columns of the detail rows, in order, once the budgets are merged on
+DETAIL_COLUMNS = ['name', 'province_name', 'district_name', 'month', 'year',
+                  'revenue_id', 'expenditure_id', 'budget_amount', 'actual_amount']
+
+# An authority's budget for a line item is the same in every month of a year
+BUDGET_KEYS = ['name', 'province_name', 'district_name', 'year']
+
+# Annual budgets, one entry per database and year. Budgets are static for a
+# year, so they are read once and reused by every detail load of that year
+# until the year is invalidated (by the change watcher when the year's
+# budgets change, or by the Refresh data button). Without the watcher they
+# expire after [cache] budget_ttl_seconds (by default the general
+# ttl_seconds); while it runs they do not expire.
+budget_cache = TTLCache(
+    ttl_seconds=get_setting('cache', 'budget_ttl_seconds', get_setting('cache', 'ttl_seconds', 600)),
+    max_entries=get_setting('cache', 'budget_years', 64),
+)
+
+
+# Annual budget rows for the given years, compacted like the detail rows.
+# Each year goes through budget_cache.get_or_load, so concurrent loads of the
+# same year share one query. The first year that has to be loaded reads
+# every year of this call that is not cached yet, in one query, and the
+# later years take their rows from it.
+def load_budgets(engine, years, timeout_seconds=None):
+    url = str(engine.url)
+    years = sorted({int(year) for year in years})
+    fetched = {}
+
+    def load(year):
+        if year not in fetched:
+            cached = {key for key, _ in budget_cache.items(lambda key: key[0] == url)}
+            missing = [other for other in years if other == year or (url, other) not in cached]
+            query, params = annual_budgets_query(missing, timeout_seconds)
+            with stage('annual budgets') as record:
+                loaded = compact_details(pd.read_sql_query(query, engine, params=params))
+                record.measure(loaded)
+            for other in missing:
+                fetched[other] = loaded[loaded['year'] == other].reset_index(drop=True)
+        return fetched[year]
+
+    frames = [budget_cache.get_or_load((url, year), lambda year=year: load(year)) for year in years]
+    present = [frame for frame in frames if len(frame)]
+    if not present:
+        return compact_details(pd.DataFrame(columns=BUDGET_KEYS + ['revenue_id', 'expenditure_id', 'budget_amount']))
+    return concat_compact(present)
+
+
+# Drop the cached budgets of the given years, or of every year
+def invalidate_budgets(years=None):
+    if years is None:
+        return budget_cache.invalidate()
+    years = {int(year) for year in years}
+    return budget_cache.invalidate(lambda key: key[1] in years)
+
+
+# Add budget_amount to actuals-only detail rows: the annual budget of the row's
+# authority, year and revenue line, or failing that its expenditure line,
+# like COALESCE(revenue budget, expenditure budget) in the joined query.
+# The name columns of the budgets are recoded to the categories of the
+# actuals first, so the merges compare category codes rather than strings.
+@timed_stage('budget merge')
+def merge_budgets(actuals, budgets):
+    recoded = budgets.assign(**{column: budgets[column].astype(actuals[column].dtype) for column in DIMENSION_COLUMNS})
+
+    found = {}
+    for id_column in ('revenue_id', 'expenditure_id'):
+        keys = BUDGET_KEYS + [id_column]
+        lookup = recoded[recoded[id_column].notna()].groupby(keys, observed=True)['budget_amount'].max().reset_index()
+        found[id_column] = actuals[keys].merge(lookup, on=keys, how='left')['budget_amount'].to_numpy(dtype='float64')
+
+    budget = np.where(np.isnan(found['revenue_id']), found['expenditure_id'], found['revenue_id'])
+    return actuals.assign(budget_amount=budget.astype(actuals['actual_amount'].dtype))[DETAIL_COLUMNS]
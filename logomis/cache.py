@@ -0,0 +1,190 @@
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+
+# A load in progress that other callers of get_or_load wait for
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = _MISSING
+        self.error = None
+        # Set when the key is invalidated during the load, so the result
+        # is handed to the waiting callers but not stored
+        self.stale = False
+
+
+class TTLCache:
+    # Thread-safe in-memory cache with a per-entry time-to-live and a maximum
+    # number of entries. When the cache is full the least recently used entry
+    # is evicted first. Concurrent get_or_load calls for the same missing key
+    # share one load (single flight). A ttl_seconds of None or 0 keeps
+    # entries until they are evicted or invalidated.
+
+    def __init__(self, ttl_seconds=600, max_entries=32, clock=time.monotonic):
+        self.ttl_seconds = ttl_seconds or None
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.RLock()
+        self._inflight = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                self.misses += 1
+                return default
+
+            expires_at, value = entry
+            if expires_at is not None and expires_at <= self._clock():
+                del self._entries[key]
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            expires_at = self._clock() + self.ttl_seconds if self.ttl_seconds is not None else None
+            self._entries[key] = (expires_at, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    # Return the cached value for key, calling loader() and storing its
+    # result on a miss. While one caller is loading a key, other callers of
+    # the same key wait for that load and get its result (or its exception)
+    # instead of starting their own; they are counted as coalesced. If the
+    # key is invalidated while the load runs, its result is returned but not
+    # cached, since it may have been read before the change.
+    def get_or_load(self, key, loader):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+
+        with self._lock:
+            # The value may have been stored since the miss above
+            value = self._peek(key)
+            if value is not _MISSING:
+                return value
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = _Flight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.value
+
+        try:
+            flight.value = loader()
+            with self._lock:
+                if not flight.stale:
+                    self.set(key, flight.value)
+            return flight.value
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            flight.done.set()
+
+    def _peek(self, key):
+        entry = self._entries.get(key, _MISSING)
+        if entry is _MISSING:
+            return _MISSING
+        expires_at, value = entry
+        if expires_at is not None and expires_at <= self._clock():
+            return _MISSING
+        return value
+
+    # Unexpired (key, value) pairs for which predicate(key) is true. Does not
+    # count as a hit or refresh the entries' position in the LRU order.
+    def items(self, predicate=None):
+        with self._lock:
+            now = self._clock()
+            return [
+                (key, value) for key, (expires_at, value) in self._entries.items()
+                if (expires_at is None or expires_at > now) and (predicate is None or predicate(key))
+            ]
+
+    # Change the time-to-live of new entries and of the unexpired entries
+    # already cached, counting from now. None or 0 turns expiry off.
+    def set_ttl(self, ttl_seconds):
+        with self._lock:
+            now = self._clock()
+            self.ttl_seconds = ttl_seconds or None
+            expires_at = now + self.ttl_seconds if self.ttl_seconds is not None else None
+            for key, (old_expires_at, value) in list(self._entries.items()):
+                if old_expires_at is not None and old_expires_at <= now:
+                    del self._entries[key]
+                else:
+                    self._entries[key] = (expires_at, value)
+
+    # Replace the value of key if it is still cached, keeping its expiry time
+    # and position. Returns whether it was replaced.
+    def replace(self, key, value):
+        with self._lock:
+            entry = self._entries.get(key, _MISSING)
+            if entry is _MISSING:
+                return False
+            self._entries[key] = (entry[0], value)
+            return True
+
+    # Keep the loads in progress for which predicate(key) is true, or all of
+    # them when no predicate is given, from storing their results. Returns
+    # the number of loads affected.
+    def expire_in_flight(self, predicate=None):
+        with self._lock:
+            flights = [flight for key, flight in self._inflight.items() if predicate is None or predicate(key)]
+            for flight in flights:
+                flight.stale = True
+            return len(flights)
+
+    # Drop every entry for which predicate(key) is true, or everything when
+    # no predicate is given, and expire the matching loads in progress.
+    # Returns the number of entries removed.
+    def invalidate(self, predicate=None):
+        with self._lock:
+            self.expire_in_flight(predicate)
+            if predicate is None:
+                removed = len(self._entries)
+                self._entries.clear()
+                return removed
+
+            keys = [key for key in self._entries if predicate(key)]
+            for key in keys:
+                del self._entries[key]
+            return len(keys)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'ttl_seconds': self.ttl_seconds,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._inflight),
+            }
+
+    def __len__(self):
+        with self._lock:
+            return len(self._entries)
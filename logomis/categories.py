@@ -0,0 +1,49 @@
+from collections import namedtuple
+
+# One revenue or expenditure line of the report tables: the id in the
+# revenues / expenditures table, the budget and actual column names used on
+# the pages, and whether it is a recurrent or non-recurrent item.
+Category = namedtuple('Category', ['id', 'budget', 'actual', 'group'])
+
+RECURRENT = 'recurrent'
+NON_RECURRENT = 'non_recurrent'
+ADDITIONAL = 'additional'
+
+# Groups the report tables show budget and actual totals for, in table order
+TOTAL_GROUPS = [RECURRENT, NON_RECURRENT]
+
+REVENUE_CATEGORIES = [
+    Category(1, 'RateTaxesBudget', 'RateTaxesActual', RECURRENT),
+    Category(2, 'RentBudget', 'RentActual', RECURRENT),
+    Category(3, 'LicenseBudget', 'LicenseActual', RECURRENT),
+    Category(4, 'FeesForServiceBudget', 'FeesForServiceActual', RECURRENT),
+    Category(5, 'WarrantCostFinePenaltiesBudget', 'WarrantCostFinePenaltiesActual', RECURRENT),
+    Category(6, 'OtherRevenueBudget', 'OtherRevenueActual', RECURRENT),
+    Category(7, 'RevenueGrantsAllBudget', 'RevenueGrantsAllActual', RECURRENT),
+    Category(8, 'RevenueGrantsOtherBudget', 'RevenueGrantsOtherActual', RECURRENT),
+    Category(9, 'CapitalGrantsBudget', 'CapitalGrantsActual', NON_RECURRENT),
+    Category(10, 'CapitalLoansBudget', 'CapitalLoansActual', NON_RECURRENT),
+    Category(15, 'SaleOfCapitalAssetsBudget', 'SaleOfCapitalAssetsActual', NON_RECURRENT),
+    Category(16, 'OtherCapitalReceiptsBudget', 'OtherCapitalReceiptsActual', NON_RECURRENT),
+]
+
+EXPENDITURE_CATEGORIES = [
+    Category(1, 'PersonalEmolumentBudget', 'PersonalEmolumentsActual_this_month', RECURRENT),
+    Category(2, 'TravelingExpensesBudget', 'TravelingExpensesActual_this_month', RECURRENT),
+    Category(3, 'SuppliesRequisitesBudget', 'SuppliesRequisitesActual_this_month', RECURRENT),
+    Category(4, 'RepairsMaintenanceofCapitalAssetsBudget', 'RepairsMaintenanceofCapitalAssetsActual_this_month', RECURRENT),
+    Category(5, 'TransportationCommunicationUtilityServiceBudget', 'TransportationCommunicationUtilityServiceActual_this_month', RECURRENT),
+    Category(6, 'InterestPaymentsDividendsBudget', 'InterestPaymentsDividendsActual_this_month', RECURRENT),
+    Category(7, 'GrantsContributionsSubsidiesBudget', 'GrantsContributionsSubsidiesActual_this_month', RECURRENT),
+    Category(8, 'PensionsRetirementBenefitsGratuitiesBudget', 'PensionsRetirementBenefitsGratuitiesActual_this_month', RECURRENT),
+    Category(9, 'CapitalExpenditureBudget', 'CapitalExpenditureActual_this_month', NON_RECURRENT),
+    Category(10, 'RehabilitationFundBudget', 'RehabilitationFundActual_this_month', NON_RECURRENT),
+    Category(11, 'LoanRepaymentsBudget', 'LoanRepaymentActual_this_month', NON_RECURRENT),
+    Category(18, 'AnyothercapitalexpenditureBudget', 'AnyothercapitalexpenditureActual_this_month', NON_RECURRENT),
+]
+
+# Revenue items that are reported in the separate "Additional" table
+ADDITIONAL_CATEGORIES = [
+    Category(11, 'StampDuty_Budget', 'StampDuty_Actual', ADDITIONAL),
+    Category(12, 'CourtFines_Budget', 'CourtFines_Actual', ADDITIONAL),
+]
@@ -0,0 +1,15 @@
+import streamlit as st
+
+
+# Read an optional setting from the Streamlit secrets file, e.g.
+#
+#   [cache]
+#   ttl_seconds = 600
+#
+# Falls back to the default when the section or key is missing, or when
+# the code is running outside of Streamlit without a secrets file.
+def get_setting(section, key, default=None):
+    try:
+        return st.secrets[section][key]
+    except (KeyError, FileNotFoundError):
+        return default
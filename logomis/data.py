@@ -0,0 +1,310 @@
+import itertools
+
+import pandas as pd
+from sqlalchemy import text
+
+from logomis.budgets import invalidate_budgets, load_budgets, merge_budgets
+from logomis.cache import TTLCache
+from logomis.config import get_setting
+from logomis.dtypes import compact_details, concat_compact, normalize_months
+from logomis.filters import FilterIndex
+from logomis.parallel import run_concurrently
+from logomis.queries import actuals_query, filter_options_query
+from logomis.snapshot import current_fingerprints, snapshot_details_query, snapshot_version_query
+from logomis.store import open_store
+from logomis.timing import register_collector, stage
+
+# Query results shared by every session in this Streamlit process. Streamlit
+# reruns the page scripts on each widget interaction, but imported modules
+# stay loaded, so this cache survives reruns. [cache] ttl_seconds = 0 keeps
+# entries until they are evicted or invalidated; while the change watcher
+# runs (see logomis.watch) expiry is turned off anyway.
+query_cache = TTLCache(
+    ttl_seconds=get_setting('cache', 'ttl_seconds', 600),
+    max_entries=get_setting('cache', 'max_entries', 32),
+)
+
+# Values derived from the cached detail frames, such as the report tables,
+# rollups and trend cubes, kept apart from query_cache so that many small
+# derived entries never evict the detail frames they are built from. An
+# entry of a frame that was evicted or refreshed is no longer requested and
+# ages out of this cache on its own.
+derived_cache = TTLCache(
+    ttl_seconds=get_setting('cache', 'ttl_seconds', 600),
+    max_entries=get_setting('cache', 'derived_entries', 128),
+)
+
+register_collector(lambda: {
+    f'logomis_{cache_name}_{name}': value
+    for cache_name, cache in (('query_cache', query_cache), ('derived_cache', derived_cache))
+    for name, value in cache.stats().items() if value is not None
+})
+
+# Detail frames kept on local disk across restarts, when [disk_cache] path is
+# set (requires pyarrow)
+disk_store = open_store(get_setting('disk_cache', 'path'))
+
+# Bumped on every load so values derived from a frame are never served for a
+# newer load of the same query
+_generations = itertools.count()
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_freeze(v) for v in value]
+        return tuple(sorted(items, key=repr)) if isinstance(value, (set, frozenset)) else tuple(items)
+    return value
+
+
+# Build the cache key for a query: the database it runs against, the SQL
+# text and its bound parameters.
+def cache_key(query, engine, params=None):
+    return (str(engine.url), str(query), _freeze(params))
+
+
+# Run a query and build a DataFrame from its rows, timing the query
+# execution and the row fetch as separate stages.
+#
+# With a chunk_size the rows are streamed from a server-side cursor
+# (stream_results, i.e. PyMySQL's SSCursor) chunk_size rows at a time, and
+# transform is applied to each chunk as it arrives. Only one chunk of raw rows
+# is held at a time, so peak memory is bounded by the chunk size and the
+# compacted result rather than by the full raw result set.
+def read_frame(query, engine, params=None, chunk_size=None, transform=None):
+    if isinstance(query, str):
+        query = text(query)
+    if chunk_size:
+        return _read_chunks(query, engine, params, chunk_size, transform)
+
+    with engine.connect() as connection:
+        with stage('query'):
+            result = connection.execute(query, params or {})
+        with stage('fetch') as record:
+            df = pd.DataFrame(result.fetchall(), columns=list(result.keys()))
+            record.measure(df)
+    return transform(df) if transform else df
+
+
+def _read_chunks(query, engine, params, chunk_size, transform):
+    transform = transform or (lambda df: df)
+    chunks = []
+    with engine.connect() as connection:
+        with stage('query'):
+            result = connection.execution_options(stream_results=True).execute(query, params or {})
+        columns = list(result.keys())
+        with stage('fetch') as record:
+            for rows in result.partitions(chunk_size):
+                chunks.append(transform(pd.DataFrame(rows, columns=columns)))
+            record.measure(sum(len(chunk) for chunk in chunks))
+
+    if not chunks:
+        return transform(pd.DataFrame(columns=columns))
+    return concat_compact(chunks)
+
+
+# Drop every cached query result, the cached annual budgets and the on-disk
+# cache, so the next page load reads from the database again.
+def invalidate():
+    if disk_store is not None:
+        disk_store.clear()
+    invalidate_budgets()
+    derived_cache.invalidate()
+    return query_cache.invalidate()
+
+
+# Version of the data behind load_details: the fingerprint of every (year,
+# month) partition, i.e. its detail count, highest detail id and amount total
+# together with those of the year's annual budgets, so an edited amount
+# changes the version as well as an inserted or deleted row. The live
+# fingerprints scan the budget tables once with a grouped aggregate; that
+# is far cheaper than the detail load it can save, but not free. For the
+# snapshot they are read from its state table.
+def data_version(engine, source='live'):
+    with stage('data version'):
+        if source == 'snapshot':
+            version = pd.read_sql_query(snapshot_version_query, engine)
+            return tuple(tuple(row) for row in version.itertuples(index=False))
+        return tuple(sorted(current_fingerprints(engine).items()))
+
+
+# Long-format revenue and expenditure detail rows for the report pages, read
+# through the shared cache with a single query. Both pages issue the same
+# query, so one scan feeds every table on both of them.
+#
+# With [reports] source = "snapshot" the rows come from the materialized
+# snapshot maintained by `python -m logomis.snapshot` instead of the live
+# tables.
+#
+# The rows are converted to compact dtypes once (see logomis.dtypes) and the
+# cached frame itself is returned, so every session shares one copy. Callers
+# must treat it as read-only and derive new frames from it instead of
+# modifying it in place. [reports] amount_dtype = "float32" halves the size
+# of the amount columns.
+#
+# The rows are streamed and compacted [reports] chunk_size rows at a time
+# (50000 by default; 0 reads the whole result in one go).
+#
+# By default the revenue and expenditure rows are read by two concurrent
+# queries ([reports] concurrent_queries = false reads them with one). Each
+# query is limited to [reports] query_timeout_seconds (120 by default).
+#
+# With [disk_cache] path set, loaded frames are also written there and a
+# cold worker reads them back from disk as long as the data version (see
+# data_version) has not changed since they were written.
+def load_details(engine, filters=None, source=None):
+    source = source or get_setting('reports', 'source', 'live')
+    amount_dtype = get_setting('reports', 'amount_dtype', 'float64')
+    key = _details_key(engine, filters, source, amount_dtype)
+
+    def load():
+        if disk_store is None:
+            details = _read_details(engine, filters, source, amount_dtype)
+        else:
+            version = data_version(engine, source)
+            details = disk_store.load(key, version)
+            if details is None:
+                details = _read_details(engine, filters, source, amount_dtype)
+                disk_store.save(key, version, details)
+        details.attrs.update({
+            'cache_key': key + (next(_generations),),
+            'filters': dict(filters or {}),
+            'source': source,
+        })
+        return details
+
+    return query_cache.get_or_load(key, load)
+
+
+def _details_key(engine, filters, source, amount_dtype):
+    build_query = snapshot_details_query if source == 'snapshot' else actuals_query
+    query, params = build_query(filters)
+    return cache_key(query, engine, params) + ('details', amount_dtype)
+
+
+# Live rows are read without the annual budget joins and the budgets are
+# merged on from the year-keyed cache in logomis.budgets; snapshot rows
+# already carry their budgets.
+def _read_details(engine, filters, source, amount_dtype):
+    chunk_size = get_setting('reports', 'chunk_size', 50000)
+    concurrent = get_setting('reports', 'concurrent_queries', True)
+    timeout = get_setting('reports', 'query_timeout_seconds', 120)
+    snapshot = source == 'snapshot'
+    build_query = snapshot_details_query if snapshot else actuals_query
+
+    def read(kind=None):
+        kind_query, kind_params = build_query(filters, kind=kind, timeout_seconds=timeout)
+        return read_frame(kind_query, engine, kind_params, chunk_size=chunk_size,
+                          transform=lambda df: compact_details(df, amount_dtype))
+
+    if concurrent:
+        # The revenue and expenditure halves run side by side on the pooled
+        # engine, so the load takes about as long as the slower one
+        tasks = {'revenue': lambda: read('revenue'), 'expenditure': lambda: read('expenditure')}
+    else:
+        tasks = {'details': read}
+    # With a year filter the budgets needed are known up front, so they load
+    # alongside the actuals
+    year = (filters or {}).get('year')
+    if not snapshot and year is not None:
+        tasks['budgets'] = lambda: load_budgets(engine, [year], timeout)
+
+    if concurrent:
+        results = run_concurrently(tasks, timeout=timeout)
+    else:
+        results = {name: task() for name, task in tasks.items()}
+    rows = concat_compact([results[name] for name in ('revenue', 'expenditure', 'details') if name in results])
+    if snapshot:
+        return rows
+
+    budgets = results.get('budgets')
+    if budgets is None:
+        budgets = load_budgets(engine, rows['year'].unique(), timeout)
+    return merge_budgets(rows, budgets)
+
+
+def _covers(filters, year, month):
+    if 'year' in filters and filters['year'] != year:
+        return False
+    if 'month' in filters:
+        return month <= filters['month'] if filters.get('upto_month') else month == filters['month']
+    return True
+
+
+# Bring the cached detail frames up to date after the given (year, month)
+# partitions of actuals, and the annual budgets of budget_years, changed in
+# the database. Only the rows of the changed partitions are read again and
+# spliced into each cached frame that covers them; frames filtered to other
+# months are left alone. For a year whose budgets changed, the budgets are
+# read again and merged onto the cached actuals of that year, which are not
+# re-read (live rows only; snapshot rows change with their partitions).
+# Tables derived from a refreshed frame are dropped, and so is the filter
+# index in case months were added or removed. Detail loads still in progress
+# are not cached. Returns the number of frames refreshed.
+def refresh_partitions(engine, partitions, source=None, budget_years=()):
+    source = source or get_setting('reports', 'source', 'live')
+    partitions = sorted(set(partitions))
+    budget_years = sorted({int(year) for year in budget_years}) if source == 'live' else []
+    refreshed = 0
+    invalidate_budgets(budget_years)
+    # Loads still running may have read the data before it changed
+    query_cache.expire_in_flight(lambda key: key[0] == str(engine.url) and key[3:4] == ('details',))
+
+    for key, details in query_cache.items(lambda key: key[0] == str(engine.url) and key[3:4] == ('details',) and len(key) == 5):
+        filters = details.attrs.get('filters', {})
+        if details.attrs.get('source') != source:
+            continue
+        touched = [(year, month) for year, month in partitions if _covers(filters, year, month)]
+        budget_touched = [year for year in budget_years if filters.get('year', year) == year]
+        if not touched and not budget_touched:
+            continue
+
+        amount_dtype = key[-1]
+        with stage('partition refresh') as record:
+            # One read per year, restricted to the touched months of that year
+            fresh = []
+            for year in sorted({year for year, _ in touched}):
+                partition_filters = {k: v for k, v in filters.items() if k not in ('month', 'upto_month')}
+                partition_filters.update(year=year, months=[month for touched_year, month in touched if touched_year == year])
+                fresh.append(_read_details(engine, partition_filters, source, amount_dtype))
+            record.measure(sum(len(frame) for frame in fresh))
+
+            codes = details['year'].astype('int32') * 100 + details['month'].astype('int32')
+            stale = codes.isin([year * 100 + month for year, month in touched])
+            kept = details[~stale]
+            rebudget = kept['year'].isin(budget_touched).to_numpy()
+            if rebudget.any():
+                timeout = get_setting('reports', 'query_timeout_seconds', 120)
+                budgets = load_budgets(engine, budget_touched, timeout)
+                kept = concat_compact([kept[~rebudget], merge_budgets(kept[rebudget], budgets)])
+            updated = concat_compact([kept] + fresh)
+
+        old_key = details.attrs['cache_key']
+        updated.attrs.update(details.attrs)
+        updated.attrs['cache_key'] = key + (next(_generations),)
+        if query_cache.replace(key, updated):
+            derived_cache.invalidate(lambda k: k[:len(old_key)] == old_key)
+            if disk_store is not None:
+                disk_store.save(key, data_version(engine, source), updated)
+            refreshed += 1
+
+    query_cache.invalidate(lambda key: key[-1:] == ('index',))
+    return refreshed
+
+
+# Cache a value computed from a frame returned by load_details, such as the
+# report tables a page builds from it. It lives as long as the load it was
+# built from and is dropped together with it by invalidate().
+def derived(details, name, builder):
+    key = details.attrs['cache_key'] + (name,)
+    return derived_cache.get_or_load(key, builder)
+
+
+# Filter index over the distinct province / district / year / month
+# combinations, for filling the selectors. Built once per cache refresh.
+# Months outside 1-12 are left out, like the report rows they would select.
+def load_filter_index(engine):
+    key = cache_key(filter_options_query, engine) + ('index',)
+    return query_cache.get_or_load(
+        key, lambda: FilterIndex(normalize_months(pd.read_sql_query(filter_options_query, engine))[0]))
@@ -0,0 +1,105 @@
+import threading
+
+import streamlit as st
+from sqlalchemy import create_engine, event
+
+from logomis.config import get_setting
+from logomis.timing import register_collector
+
+_engine = None
+_engine_lock = threading.Lock()
+
+# Counters updated by pool events; pool_stats() merges them with the live
+# pool gauges so the pool can be sized from real traffic.
+_pool_counters = {
+    'connects': 0,
+    'checkouts': 0,
+    'checkins': 0,
+    'invalidations': 0,
+}
+_counter_lock = threading.Lock()
+
+
+def _count(name):
+    with _counter_lock:
+        _pool_counters[name] += 1
+
+
+# Build the MySQL connection string from the [connections.my_database]
+# section of the Streamlit secrets. Raises KeyError when a key is missing.
+def connection_string(secrets=None):
+    if secrets is None:
+        secrets = st.secrets["connections"]["my_database"]
+    return f"mysql+pymysql://{secrets['username']}:{secrets['password']}@{secrets['host']}:{secrets['port']}/{secrets['database']}"
+
+
+# Pool options, overridable from the [database] section of the secrets:
+#
+#   [database]
+#   pool_size = 5
+#   max_overflow = 10
+#   pool_recycle = 1800
+#   pool_pre_ping = true
+#   pool_timeout = 30
+def pool_options():
+    return {
+        'pool_size': get_setting('database', 'pool_size', 5),
+        'max_overflow': get_setting('database', 'max_overflow', 10),
+        'pool_recycle': get_setting('database', 'pool_recycle', 1800),
+        'pool_pre_ping': get_setting('database', 'pool_pre_ping', True),
+        'pool_timeout': get_setting('database', 'pool_timeout', 30),
+    }
+
+
+def _attach_pool_listeners(engine):
+    event.listen(engine, 'connect', lambda *args: _count('connects'))
+    event.listen(engine, 'checkout', lambda *args: _count('checkouts'))
+    event.listen(engine, 'checkin', lambda *args: _count('checkins'))
+    event.listen(engine, 'invalidate', lambda *args: _count('invalidations'))
+
+
+# Create a pooled engine for the given URL and attach the pool counters.
+def create_pooled_engine(url, **options):
+    engine = create_engine(url, **{**pool_options(), **options})
+    _attach_pool_listeners(engine)
+    return engine
+
+
+# Return the engine shared by every page and session in this process,
+# creating it on first use.
+def get_engine():
+    global _engine
+    if _engine is None:
+        with _engine_lock:
+            if _engine is None:
+                _engine = create_pooled_engine(connection_string())
+    return _engine
+
+
+# Release every pooled connection, e.g. after the database credentials
+# change. The next get_engine() call builds a fresh engine.
+def dispose_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.dispose()
+            _engine = None
+
+
+# Live pool gauges plus the cumulative event counters.
+def pool_stats(engine=None):
+    engine = engine or _engine
+    with _counter_lock:
+        stats = dict(_pool_counters)
+    if engine is None:
+        return stats
+
+    pool = engine.pool
+    for name in ('size', 'checkedin', 'checkedout', 'overflow'):
+        gauge = getattr(pool, name, None)
+        if gauge is not None:
+            stats[name] = gauge()
+    return stats
+
+
+register_collector(lambda: {f'logomis_pool_{name}': value for name, value in pool_stats().items()})
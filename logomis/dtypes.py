@@ -0,0 +1,95 @@
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from logomis.timing import timed_stage
+
+DIMENSION_COLUMNS = ['name', 'province_name', 'district_name']
+AMOUNT_COLUMNS = ['budget_amount', 'actual_amount']
+AMOUNT_DTYPES = ('float64', 'float32')
+
+# Month stored for detail rows whose month is not a whole number from 1 to 12
+INVALID_MONTH = 0
+
+
+def _valid_months(months):
+    return (months >= 1) & (months <= 12) & (months % 1 == 0)
+
+
+# Shrink the long-format detail rows before they are cached and shared:
+# authority, province and district names become categoricals instead of one
+# Python string per row, month and year become small integers, the
+# revenue/expenditure ids become nullable small integers, and amounts become
+# float64 or, with amount_dtype='float32', half that size.
+#
+# MySQL DECIMAL columns arrive as Python Decimal objects; pd.to_numeric turns
+# them into plain floats here as well.
+#
+# A month that is missing, not a number or not a whole number from 1 to 12
+# is stored as INVALID_MONTH before the narrowing cast, so it can neither
+# fail the load nor wrap around into a valid month; normalize_months drops
+# and counts those rows.
+@timed_stage('compact dtypes')
+def compact_details(details, amount_dtype='float64'):
+    if amount_dtype not in AMOUNT_DTYPES:
+        raise ValueError(f'amount_dtype must be one of {AMOUNT_DTYPES}, not {amount_dtype!r}')
+
+    columns = {}
+    for column in DIMENSION_COLUMNS:
+        if column in details:
+            columns[column] = details[column].astype('category')
+    if 'month' in details:
+        months = pd.to_numeric(details['month'], errors='coerce')
+        columns['month'] = months.where(_valid_months(months), INVALID_MONTH).astype('int8')
+    if 'year' in details:
+        columns['year'] = pd.to_numeric(details['year'], downcast='integer').astype('int16')
+    for column in ('revenue_id', 'expenditure_id'):
+        if column in details:
+            columns[column] = pd.to_numeric(details[column]).astype('Int16')
+    for column in AMOUNT_COLUMNS:
+        if column in details:
+            columns[column] = pd.to_numeric(details[column]).astype(amount_dtype)
+    return details.assign(**columns)
+
+
+# Keep only rows whose month is a whole number from 1 to 12, with month as a
+# small integer. Returns the rows and the number dropped, which for frames
+# from compact_details are the rows it marked with INVALID_MONTH. This is a
+# numeric range mask, so it replaces the old zfill / regex / to_datetime
+# round trip through strings.
+@timed_stage('month validation')
+def normalize_months(df):
+    months = pd.to_numeric(df['month'], errors='coerce')
+    valid = _valid_months(months)
+    dropped = int(len(df) - valid.sum())
+    if dropped:
+        df = df[valid.to_numpy()]
+        months = months[valid]
+    if df['month'].dtype != 'int8':
+        df = df.assign(month=months.astype('int8'))
+    return df, dropped
+
+
+# Concatenate frames produced by compact_details, e.g. the chunks of a
+# streamed query, keeping the categorical columns categorical. A plain
+# pd.concat would turn categoricals with different categories into object
+# columns. Frames without rows are left out: an empty query result has
+# object-dtype categories, which union_categoricals refuses to combine with
+# the string categories of a non-empty one.
+def concat_compact(frames):
+    frames = [frame for frame in frames if len(frame)] or frames[:1]
+    if len(frames) == 1:
+        return frames[0]
+
+    columns = {}
+    for column in frames[0].columns:
+        if isinstance(frames[0][column].dtype, pd.CategoricalDtype):
+            columns[column] = pd.Series(union_categoricals([frame[column] for frame in frames], sort_categories=True))
+        else:
+            columns[column] = pd.concat([frame[column] for frame in frames], ignore_index=True)
+    return pd.DataFrame(columns)
+
+
+# Approximate memory held by a frame, including string and categorical
+# payloads.
+def frame_bytes(df):
+    return int(df.memory_usage(index=True, deep=True).sum())
@@ -0,0 +1,97 @@
+import tempfile
+import zipfile
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional: without pyarrow there is no Parquet export
+    pq = None
+
+try:
+    import xlsxwriter
+except ImportError:  # optional: without XlsxWriter there is no Excel export
+    xlsxwriter = None
+
+from logomis.config import get_setting
+from logomis.timing import timed_stage
+
+# File extension and MIME type of each export format. CSV and Parquet
+# exports are zip archives with one file per table, since the tables have
+# different columns; Excel exports have one sheet per table.
+EXPORT_FORMATS = {
+    'CSV': ('zip', 'application/zip'),
+    'Excel': ('xlsx', 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    'Parquet': ('zip', 'application/zip'),
+}
+
+# Spill export files larger than this to disk instead of keeping them in memory
+_SPOOL_BYTES = 32 * 1024 * 1024
+
+
+def available_formats():
+    formats = ['CSV']
+    if xlsxwriter is not None:
+        formats.append('Excel')
+    if pq is not None:
+        formats.append('Parquet')
+    return formats
+
+
+# Rows of df at the given positions, chunk_rows at a time. Each chunk is a
+# small slice, so a full filtered copy of the table is never built.
+def _chunks(df, positions, chunk_rows):
+    for start in range(0, len(positions), chunk_rows):
+        yield df.iloc[positions[start:start + chunk_rows]]
+
+
+def _write_csv(member, df, positions, chunk_rows):
+    if len(positions) == 0:
+        member.write(df.iloc[:0].to_csv(index=False).encode('utf-8'))
+    for number, chunk in enumerate(_chunks(df, positions, chunk_rows)):
+        member.write(chunk.to_csv(index=False, header=number == 0).encode('utf-8'))
+
+
+def _write_parquet(member, df, positions, chunk_rows):
+    writer = None
+    for chunk in _chunks(df, positions, chunk_rows) if len(positions) else [df.iloc[:0]]:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(member, table.schema)
+        writer.write_table(table)
+    writer.close()
+
+
+# XlsxWriter's constant_memory mode flushes each row to disk as it is
+# written, so only the current chunk is held in memory
+def _write_xlsx(out, selections, chunk_rows):
+    workbook = xlsxwriter.Workbook(out, {'constant_memory': True, 'nan_inf_to_errors': True})
+    for name, df, positions in selections:
+        sheet = workbook.add_worksheet(name[:31])
+        sheet.write_row(0, 0, list(df.columns))
+        row = 1
+        for chunk in _chunks(df, positions, chunk_rows):
+            for values in chunk.itertuples(index=False, name=None):
+                sheet.write_row(row, 0, values)
+                row += 1
+    workbook.close()
+
+
+# Export the selected rows of each table in one of EXPORT_FORMATS.
+# selections is a list of (name, table, row positions). The rows are written
+# chunk_rows at a time ([export] chunk_rows, 50000 by default) into a
+# temporary file that spills to disk once it grows large. Returns the
+# file's bytes.
+@timed_stage('export')
+def export_tables(export_format, selections, chunk_rows=None):
+    chunk_rows = chunk_rows or get_setting('export', 'chunk_rows', 50000)
+    with tempfile.SpooledTemporaryFile(max_size=_SPOOL_BYTES) as out:
+        if export_format == 'Excel':
+            _write_xlsx(out, selections, chunk_rows)
+        else:
+            extension, write = ('csv', _write_csv) if export_format == 'CSV' else ('parquet', _write_parquet)
+            with zipfile.ZipFile(out, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for name, df, positions in selections:
+                    with archive.open(f'{name}.{extension}', 'w') as member:
+                        write(member, df, positions, chunk_rows)
+        out.seek(0)
+        return out.read()
@@ -0,0 +1,71 @@
+import numpy as np
+
+
+class FilterIndex:
+    # Lookup structure for the province -> district -> year/month selectors,
+    # built once per data refresh. Row positions are grouped by (year, month)
+    # and then by (province, district), so both the option lists and a
+    # filtered slice cost time proportional to the result instead of a full
+    # boolean-mask scan of the table.
+
+    def __init__(self, df):
+        groups = df.groupby(['year', 'month', 'province_name', 'district_name'], observed=True, sort=False).indices
+
+        self.partitions = {}
+        districts_by_province = {}
+        years = set()
+        months = set()
+        for (year, month, province, district), positions in groups.items():
+            self.partitions.setdefault((year, month), {})[(province, district)] = positions
+            districts_by_province.setdefault(province, set()).add(district)
+            years.add(year)
+            months.add(month)
+
+        self.districts_by_province = {
+            province: sorted(districts) for province, districts in sorted(districts_by_province.items())
+        }
+        self.years = sorted(years)
+        self.months = sorted(months)
+
+    def province_options(self):
+        return list(self.districts_by_province)
+
+    # Districts of one province, or of every province when province is None
+    def district_options(self, province=None):
+        if province is not None:
+            return list(self.districts_by_province.get(province, []))
+        districts = {}
+        for province_districts in self.districts_by_province.values():
+            districts.update(dict.fromkeys(province_districts))
+        return list(districts)
+
+    # Row positions matching the selection, in table order. provinces and
+    # districts are collections of names, or None for all of them.
+    def positions(self, year, month, provinces=None, districts=None):
+        partition = self.partitions.get((year, month), {})
+        if provinces is not None:
+            provinces = set(provinces)
+        if districts is not None:
+            districts = set(districts)
+
+        selected = [
+            positions for (province, district), positions in partition.items()
+            if (provinces is None or province in provinces) and (districts is None or district in districts)
+        ]
+        if not selected:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(selected))
+
+    # Row positions of every month of a year matching the selection, in table
+    # order
+    def year_positions(self, year, provinces=None, districts=None):
+        selected = [self.positions(year, month, provinces, districts)
+                    for partition_year, month in self.partitions if partition_year == year]
+        if not selected:
+            return np.array([], dtype=np.intp)
+        return np.sort(np.concatenate(selected))
+
+    # The rows of df (the frame this index was built from) matching the
+    # selection.
+    def select(self, df, year, month, provinces=None, districts=None):
+        return df.iloc[self.positions(year, month, provinces, districts)]
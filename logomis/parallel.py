@@ -0,0 +1,58 @@
+import contextvars
+import threading
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
+
+from logomis.config import get_setting
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class QueryTimeout(TimeoutError):
+    pass
+
+
+# Thread pool shared by every session, sized by [reports] max_workers. Keep
+# it no larger than the connection pool so workers do not queue for
+# connections.
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=get_setting('reports', 'max_workers', 4),
+                    thread_name_prefix='logomis-query',
+                )
+    return _executor
+
+
+# Run independent loads concurrently and return {name: result}. tasks maps a
+# name to a function taking no arguments. Each task runs in a copy of the
+# caller's context, so its stages are timed as part of the current page run.
+#
+# If a task fails, or the tasks do not all finish within timeout seconds,
+# tasks that have not started yet are cancelled and the error (or
+# QueryTimeout) is raised. Queries already running are left to the database's
+# own timeout, see queries.with_timeout.
+def run_concurrently(tasks, timeout=None):
+    executor = get_executor()
+    futures = {
+        name: executor.submit(contextvars.copy_context().run, task)
+        for name, task in tasks.items()
+    }
+
+    done, pending = wait(futures.values(), timeout=timeout, return_when=FIRST_EXCEPTION)
+    for future in done:
+        if future.exception() is not None:
+            for other in pending:
+                other.cancel()
+            raise future.exception()
+
+    if pending:
+        for future in pending:
+            future.cancel()
+        names = [name for name, future in futures.items() if future in pending]
+        raise QueryTimeout(f"Timed out after {timeout}s waiting for: {', '.join(names)}")
+
+    return {name: future.result() for name, future in futures.items()}
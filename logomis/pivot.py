@@ -0,0 +1,56 @@
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+# Columns identifying one row of the report tables
+KEY_COLUMNS = ['name', 'province_name', 'district_name', 'month', 'year']
+
+
+_id_columns = {
+    'revenue': 'revenue_id',
+    'expenditure': 'expenditure_id',
+}
+
+
+# The 'revenue' or 'expenditure' rows of the combined detail rows, with their
+# revenue_id / expenditure_id as category_id.
+def category_rows(details, kind):
+    id_column = _id_columns[kind]
+    rows = details[details[id_column].notna()]
+    rows = rows[KEY_COLUMNS + ['budget_amount', 'actual_amount']].assign(category_id=rows[id_column].astype('int64'))
+    return rows
+
+
+# Turn long-format detail rows (one row per authority, month, year and
+# category_id, with budget_amount and actual_amount) into the wide report
+# layout: one row per authority and month, with a budget and an actual
+# column per category.
+#
+# Every authority-month present in details gets a row, even when it has none
+# of the requested categories; those amounts are 0. This matches the old
+# MAX(CASE WHEN ... ELSE 0 END) queries. Rows are ordered by name, year and
+# month like the old ORDER BY.
+@timed_stage('pivot')
+def pivot_categories(details, categories):
+    ids = [category.id for category in categories]
+    rows = details[KEY_COLUMNS].drop_duplicates()
+
+    subset = details[details['category_id'].isin(ids)]
+    wide = (
+        subset.groupby(KEY_COLUMNS + ['category_id'], sort=False, observed=True)[['budget_amount', 'actual_amount']]
+        .max()
+        .unstack('category_id')
+    )
+
+    columns = {}
+    for category in categories:
+        for amount, column in (('budget_amount', category.budget), ('actual_amount', category.actual)):
+            if (amount, category.id) in wide.columns:
+                columns[column] = wide[(amount, category.id)]
+            else:
+                columns[column] = pd.Series(0, index=wide.index, dtype=details[amount].dtype)
+    wide = pd.DataFrame(columns, index=wide.index).reset_index()
+
+    report_df = rows.merge(wide, on=KEY_COLUMNS, how='left')
+    report_df = report_df.sort_values(['name', 'year', 'month'], kind='stable').reset_index(drop=True)
+    return report_df
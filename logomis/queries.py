@@ -0,0 +1,290 @@
+from sqlalchemy import bindparam, text
+
+# Distinct province / district / year / month combinations, used to fill the
+# selectors without loading the report tables first.
+filter_options_query = '''
+SELECT DISTINCT
+    provinces.name AS province_name,
+    districts.name AS district_name,
+    actual_budgets.year,
+    actual_budgets.month
+FROM 
+    actual_budgets
+INNER JOIN 
+    local_authorities ON local_authorities.id = actual_budgets.local_authority_id
+INNER JOIN 
+    districts ON districts.id = local_authorities.district_id
+INNER JOIN 
+    provinces ON provinces.id = districts.province_id
+ORDER BY
+    provinces.name,
+    districts.name,
+    actual_budgets.year,
+    actual_budgets.month;
+'''
+
+
+# Build the filters for a report query from the page selections. Pass None
+# (or 'All Provinces' / 'All Districts') to leave a dimension unrestricted.
+# With upto_month=True every month from January up to the selected one is
+# kept, which is what the cumulative "upto this month" page needs.
+def report_filters(province=None, district=None, year=None, month=None, upto_month=False):
+    filters = {}
+    if province not in (None, 'All Provinces'):
+        filters['provinces'] = [province] if isinstance(province, str) else list(province)
+    if district not in (None, 'All Districts'):
+        filters['districts'] = [district] if isinstance(district, str) else list(district)
+    if year is not None:
+        filters['year'] = int(year)
+    if month is not None:
+        filters['month'] = int(month)
+        filters['upto_month'] = upto_month
+    return filters
+
+
+# Columns the filters apply to in the report queries
+FILTER_COLUMNS = {
+    'year': 'actual_budgets.year',
+    'month': 'actual_budgets.month',
+    'provinces': 'provinces.name',
+    'districts': 'districts.name',
+}
+
+
+# WHERE clause and bound parameters for the given filters, added to any fixed
+# predicates the query already needs. Besides the keys report_filters sets,
+# 'months' restricts the rows to a list of months. The year and month
+# predicates come first so MySQL can use the
+# actual_budgets(year, month, local_authority_id) index from
+# migrations/001_report_indexes.sql.
+def where_clause(filters, predicates=(), columns=None):
+    columns = columns or FILTER_COLUMNS
+    predicates = list(predicates)
+    params = {}
+    expanding = []
+
+    if 'year' in filters:
+        predicates.append(f"{columns['year']} = :year")
+        params['year'] = filters['year']
+    if 'month' in filters:
+        if filters.get('upto_month'):
+            predicates.append(f"{columns['month']} BETWEEN 1 AND :month")
+        else:
+            predicates.append(f"{columns['month']} = :month")
+        params['month'] = filters['month']
+    if 'months' in filters:
+        predicates.append(f"{columns['month']} IN :months")
+        params['months'] = sorted(int(month) for month in filters['months'])
+        expanding.append('months')
+    if 'provinces' in filters:
+        predicates.append(f"{columns['provinces']} IN :provinces")
+        params['provinces'] = list(filters['provinces'])
+        expanding.append('provinces')
+    if 'districts' in filters:
+        predicates.append(f"{columns['districts']} IN :districts")
+        params['districts'] = list(filters['districts'])
+        expanding.append('districts')
+
+    if not predicates:
+        return '', params, expanding
+    return 'WHERE \n    ' + '\n    AND '.join(predicates) + '\n', params, expanding
+
+
+# Long-format detail rows for the report tables: one row per authority,
+# month, year and line item, where a line item is either a revenue_id or an
+# expenditure_id, with its annual budget and actual amount. A single scan of
+# actual_budget_details feeds the revenue, expenditure and additional tables;
+# logomis.pivot turns the rows into the wide layout using the categories in
+# logomis.categories.
+#
+# The annual budget is joined twice, once per kind of line item, so each join
+# stays a plain equality MySQL can serve from an index.
+_details_query = '''
+SELECT 
+    local_authorities.name AS name,
+    provinces.name AS province_name,
+    districts.name AS district_name,
+    actual_budgets.month,
+    actual_budgets.year,
+    actual_budget_details.revenue_id,
+    actual_budget_details.expenditure_id,
+    MAX(COALESCE(revenue_budget_details.total_amount, expenditure_budget_details.total_amount)) AS budget_amount,
+    MAX(actual_budget_details.total_amount) AS actual_amount
+FROM 
+    actual_budgets
+INNER JOIN 
+    actual_budget_details ON actual_budgets.id = actual_budget_details.actual_budget_id
+INNER JOIN 
+    local_authorities ON local_authorities.id = actual_budgets.local_authority_id
+INNER JOIN 
+    districts ON districts.id = local_authorities.district_id
+INNER JOIN 
+    provinces ON provinces.id = districts.province_id 
+LEFT JOIN 
+    annual_budgets ON annual_budgets.local_authority_id = local_authorities.id AND annual_budgets.year = actual_budgets.year
+LEFT JOIN 
+    annual_budget_details AS revenue_budget_details ON revenue_budget_details.annual_budget_id = annual_budgets.id AND revenue_budget_details.revenue_id = actual_budget_details.revenue_id
+LEFT JOIN 
+    annual_budget_details AS expenditure_budget_details ON expenditure_budget_details.annual_budget_id = annual_budgets.id AND expenditure_budget_details.expenditure_id = actual_budget_details.expenditure_id
+{where}GROUP BY 
+    local_authorities.name,
+    provinces.name, 
+    districts.name, 
+    actual_budgets.month, 
+    actual_budgets.year,
+    actual_budget_details.revenue_id,
+    actual_budget_details.expenditure_id;
+'''
+
+
+# Actual amounts only, in the detail row layout without budget_amount. The
+# report pages read this instead of _details_query and merge the annual
+# budgets on in memory from a year-keyed cache (see logomis.budgets), so the
+# static annual figures are not joined again for every monthly row.
+_actuals_query = '''
+SELECT 
+    local_authorities.name AS name,
+    provinces.name AS province_name,
+    districts.name AS district_name,
+    actual_budgets.month,
+    actual_budgets.year,
+    actual_budget_details.revenue_id,
+    actual_budget_details.expenditure_id,
+    MAX(actual_budget_details.total_amount) AS actual_amount
+FROM 
+    actual_budgets
+INNER JOIN 
+    actual_budget_details ON actual_budgets.id = actual_budget_details.actual_budget_id
+INNER JOIN 
+    local_authorities ON local_authorities.id = actual_budgets.local_authority_id
+INNER JOIN 
+    districts ON districts.id = local_authorities.district_id
+INNER JOIN 
+    provinces ON provinces.id = districts.province_id 
+{where}GROUP BY 
+    local_authorities.name,
+    provinces.name, 
+    districts.name, 
+    actual_budgets.month, 
+    actual_budgets.year,
+    actual_budget_details.revenue_id,
+    actual_budget_details.expenditure_id;
+'''
+
+# Annual budget amounts per authority, year and line item, for the given
+# years. One row per revenue or expenditure line, twelve times fewer than the
+# monthly detail rows it is merged onto.
+_annual_budgets_query = '''
+SELECT 
+    local_authorities.name AS name,
+    provinces.name AS province_name,
+    districts.name AS district_name,
+    annual_budgets.year,
+    annual_budget_details.revenue_id,
+    annual_budget_details.expenditure_id,
+    MAX(annual_budget_details.total_amount) AS budget_amount
+FROM 
+    annual_budgets
+INNER JOIN 
+    annual_budget_details ON annual_budget_details.annual_budget_id = annual_budgets.id
+INNER JOIN 
+    local_authorities ON local_authorities.id = annual_budgets.local_authority_id
+INNER JOIN 
+    districts ON districts.id = local_authorities.district_id
+INNER JOIN 
+    provinces ON provinces.id = districts.province_id 
+WHERE 
+    annual_budgets.year IN :years
+GROUP BY 
+    local_authorities.name,
+    provinces.name, 
+    districts.name, 
+    annual_budgets.year,
+    annual_budget_details.revenue_id,
+    annual_budget_details.expenditure_id;
+'''
+
+
+# Only the 'revenue' or only the 'expenditure' half of the detail rows, so
+# the two can be read concurrently
+KIND_PREDICATES = {
+    'revenue': 'actual_budget_details.revenue_id IS NOT NULL',
+    'expenditure': 'actual_budget_details.expenditure_id IS NOT NULL',
+}
+
+
+# Detail query with the given filters as bound WHERE predicates, optionally
+# restricted to one kind of line item. Returns (query, params) ready for
+# read_frame.
+def details_query(filters=None, kind=None, timeout_seconds=None):
+    predicates = [KIND_PREDICATES[kind]] if kind else []
+    where, params, expanding = where_clause(filters or {}, predicates)
+    sql = with_timeout(_details_query.format(where=where), timeout_seconds)
+    return bound_query(sql, params, expanding)
+
+
+# Actuals-only counterpart of details_query, with the same filters and kinds
+def actuals_query(filters=None, kind=None, timeout_seconds=None):
+    predicates = [KIND_PREDICATES[kind]] if kind else []
+    where, params, expanding = where_clause(filters or {}, predicates)
+    sql = with_timeout(_actuals_query.format(where=where), timeout_seconds)
+    return bound_query(sql, params, expanding)
+
+
+# Annual budget query for the given years. Returns (query, params).
+def annual_budgets_query(years, timeout_seconds=None):
+    sql = with_timeout(_annual_budgets_query, timeout_seconds)
+    return bound_query(sql, {'years': sorted(int(year) for year in years)}, ['years'])
+
+
+# Add a MySQL MAX_EXECUTION_TIME optimizer hint so the server aborts the
+# SELECT once it runs longer than timeout_seconds. Other databases read the
+# hint as a plain comment.
+def with_timeout(sql, timeout_seconds=None):
+    if not timeout_seconds:
+        return sql
+    hint = f'/*+ MAX_EXECUTION_TIME({int(timeout_seconds * 1000)}) */'
+    return sql.replace('SELECT', f'SELECT {hint}', 1)
+
+
+# Wrap SQL text with its bound parameters, marking the IN-list parameters as
+# expanding. Returns (query, params) ready for read_frame.
+def bound_query(sql, params, expanding=()):
+    statement = text(sql)
+    if expanding:
+        statement = statement.bindparams(*[bindparam(name, expanding=True) for name in expanding])
+    return statement, params or None
+
+
+# Cheap change fingerprints, one row per year and month of actuals and one
+# row per year of annual budgets. A partition whose counts, highest id or
+# amount total changed has new or edited submissions.
+actual_fingerprint_query = '''
+SELECT 
+    actual_budgets.year,
+    actual_budgets.month,
+    COUNT(actual_budget_details.id) AS detail_count,
+    MAX(actual_budget_details.id) AS max_detail_id,
+    SUM(actual_budget_details.total_amount) AS amount_total
+FROM 
+    actual_budgets
+LEFT JOIN 
+    actual_budget_details ON actual_budgets.id = actual_budget_details.actual_budget_id
+GROUP BY 
+    actual_budgets.year,
+    actual_budgets.month;
+'''
+
+annual_fingerprint_query = '''
+SELECT 
+    annual_budgets.year,
+    COUNT(annual_budget_details.id) AS detail_count,
+    MAX(annual_budget_details.id) AS max_detail_id,
+    SUM(annual_budget_details.total_amount) AS amount_total
+FROM 
+    annual_budgets
+LEFT JOIN 
+    annual_budget_details ON annual_budgets.id = annual_budget_details.annual_budget_id
+GROUP BY 
+    annual_budgets.year;
+'''
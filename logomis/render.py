@@ -0,0 +1,49 @@
+import math
+
+import pandas as pd
+import streamlit as st
+
+from logomis.config import get_setting
+
+_TABLE_ORDER = '(table order)'
+
+
+# One page of rows, sorted on the server. The first pages of a numeric sort
+# use nsmallest / nlargest, a partial selection, instead of sorting every row.
+def page_rows(df, page, page_size, sort_by=None, descending=False):
+    start = (page - 1) * page_size
+    end = start + page_size
+    if sort_by is None:
+        return df.iloc[start:end]
+
+    column = df[sort_by]
+    if pd.api.types.is_numeric_dtype(column) and end <= len(df) // 4:
+        top = df.nlargest(end, sort_by) if descending else df.nsmallest(end, sort_by)
+        return top.iloc[start:end]
+    return df.sort_values(sort_by, ascending=not descending, kind='stable').iloc[start:end]
+
+
+# Show a table one page at a time, so only the visible rows (and the chosen
+# columns) are sent to the browser instead of the whole frame. Tables that
+# fit on one page are shown as they are. key must be unique on the page.
+def show_table(df, key, page_size=None):
+    page_size = page_size or get_setting('reports', 'page_size', 50)
+    if len(df) <= page_size:
+        st.dataframe(df)
+        return
+
+    all_columns = list(df.columns)
+    columns = st.multiselect('Columns', all_columns, default=all_columns, key=f'{key}_columns') or all_columns
+
+    sort_column, order_column, page_column = st.columns(3)
+    sort_by = sort_column.selectbox('Sort by', [_TABLE_ORDER] + all_columns, key=f'{key}_sort')
+    descending = order_column.checkbox('Descending', key=f'{key}_descending')
+    page_count = math.ceil(len(df) / page_size)
+    page = page_column.number_input(f'Page (of {page_count})', min_value=1, max_value=page_count, value=1,
+                                    step=1, key=f'{key}_page')
+
+    rows = page_rows(df, int(page), page_size, None if sort_by == _TABLE_ORDER else sort_by, descending)
+    st.dataframe(rows[columns])
+
+    first = (int(page) - 1) * page_size + 1
+    st.caption(f'Rows {first}-{first + len(rows) - 1} of {len(df)}')
@@ -0,0 +1,384 @@
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+import sqlalchemy
+import streamlit as st
+
+from logomis.analytics import METRICS, ExecutionMetrics, budget_item, ranking_frame, top_n
+from logomis.config import get_setting
+from logomis.data import derived, derived_cache, invalidate, load_details, load_filter_index, query_cache
+from logomis.db import get_engine, pool_stats
+from logomis.dtypes import normalize_months
+from logomis.export import EXPORT_FORMATS, available_formats, export_tables
+from logomis.filters import FilterIndex
+from logomis.parallel import QueryTimeout
+from logomis.pivot import category_rows, pivot_categories
+from logomis.queries import report_filters
+from logomis.render import show_table
+from logomis.rollup import ROLLUP_LEVELS, Rollup
+from logomis.timeseries import LEVELS, TimeSeriesCube
+from logomis.timing import stage, start_metrics_server, start_run
+from logomis.totals import group_totals
+from logomis.watch import start_watcher
+from logomis.ytd import add_ytd_columns
+
+# Columns every report table starts with
+LAYOUT_KEYS = ['name', 'month', 'year', 'province_name', 'district_name']
+
+# Budget and actual total columns over the categories of one group
+Total = namedtuple('Total', ['group', 'budget', 'actual'])
+
+# One table of a report view: the key it is cached and keyed under, its
+# heading, which detail rows (kind) and categories are pivoted into it, the
+# group totals added after each group's columns, and the suffix appended to
+# the actual column names (for year-to-date views, the names of the
+# cumulative columns).
+TableSpec = namedtuple('TableSpec', ['key', 'title', 'kind', 'categories', 'totals', 'actual_suffix'])
+
+
+# The pivoted tables every view is built from, with the detail rows whose
+# month is outside 1-12 left out. They are cached with the detail rows, so
+# the "this month" and "up to this month" pages share one copy and only
+# differ in the cheap steps that follow. Returns ({key: table}, dropped).
+def report_base(details, specs):
+    def build():
+        with stage('transform'):
+            month_details, invalid_months = normalize_months(details)
+            tables = {}
+            for spec in specs:
+                table = pivot_categories(category_rows(month_details, spec.kind), spec.categories)
+                table.fillna(0, inplace=True)
+                tables[spec.key] = table
+        return tables, invalid_months
+
+    return derived(details, ('report base',) + tuple(spec.key for spec in specs), build)
+
+
+class ReportView:
+    # A report page over the shared base tables: optionally year-to-date
+    # actuals, then group totals, then the column layout, each table with a
+    # FilterIndex for the province / district / month selections.
+
+    def __init__(self, name, tables, ytd=False):
+        self.name = name
+        self.tables = tables
+        self.ytd = ytd
+
+    def build_table(self, spec, base):
+        actual_columns = [category.actual for category in spec.categories]
+        if self.ytd:
+            # Sort by authority, year and month so the cumulative sum runs in month order
+            table = base.sort_values(by=['name', 'province_name', 'district_name', 'year', 'month'])
+            table = add_ytd_columns(table, actual_columns, spec.actual_suffix)
+        elif spec.actual_suffix:
+            table = base.rename(columns={column: column + spec.actual_suffix for column in actual_columns})
+        else:
+            table = base
+
+        if spec.totals:
+            table = pd.concat([table, group_totals(table, spec.categories, spec.totals, spec.actual_suffix)], axis=1)
+
+        # Each group's total columns follow the last column of the group
+        layout = list(LAYOUT_KEYS)
+        totals = {total.group: total for total in spec.totals}
+        for index, category in enumerate(spec.categories):
+            layout += [category.budget, category.actual + spec.actual_suffix]
+            last_of_group = index + 1 == len(spec.categories) or spec.categories[index + 1].group != category.group
+            if last_of_group and category.group in totals:
+                layout += [totals[category.group].budget, totals[category.group].actual]
+        return table[layout]
+
+    # The view's tables with their filter indexes, cached with the detail
+    # rows. Returns ([(table, index), ...], invalid_months).
+    def build(self, details):
+        def build_tables():
+            base, invalid_months = report_base(details, self.tables)
+            with stage('transform'):
+                tables = [self.build_table(spec, base[spec.key]) for spec in self.tables]
+            with stage('filter index'):
+                return [(df, FilterIndex(df)) for df in tables], invalid_months
+
+        return derived(details, self.name, build_tables)
+
+    # District, province and national sums of each table, built once per
+    # load and cached with the tables
+    def rollups(self, details, tables):
+        return [
+            derived(details, (self.name, 'rollup', spec.key),
+                    lambda df=df: Rollup(df, [column for column in df.columns if column not in LAYOUT_KEYS]))
+            for spec, (df, _) in zip(self.tables, tables)
+        ]
+
+    # Filter the tables to the selection and send them to the browser.
+    # provinces and districts are lists of names, or None for all of them.
+    # Above the Authority level the rows come from the view's rollups, so the
+    # province and district selectors drill down from national totals to
+    # the districts of one province.
+    def display(self, details, tables, provinces, districts, month, year, level='Authority'):
+        with stage('filter') as record:
+            if level == 'Authority':
+                selected = [index.select(df, year, month, provinces, districts) for df, index in tables]
+            else:
+                selected = [rollup.lookup(level, year, month, provinces, districts)
+                            for rollup in self.rollups(details, tables)]
+            record.measure(sum(len(df) for df in selected))
+
+        with stage('render'):
+            for spec, df in zip(self.tables, selected):
+                if df.empty:
+                    st.write(f"No {spec.key} data found for the selected filters.")
+                else:
+                    st.markdown(f'**{spec.title}**' if level == 'Authority' else f'**{spec.title} ({level})**')
+                    show_table(df, key=spec.key)
+
+    # Execution metrics of each budget line and group total of a table,
+    # cached with the tables. The year-to-date view's pace is measured
+    # against the months elapsed, the monthly view's against one month.
+    def execution_metrics(self, details, spec, df):
+        def build():
+            items = [budget_item(category.budget, category.actual + spec.actual_suffix) for category in spec.categories]
+            items += [budget_item(total.budget, total.actual) for total in spec.totals]
+            months_elapsed = df['month'].to_numpy() if self.ytd else np.ones(len(df))
+            return ExecutionMetrics(df, items, months_elapsed)
+
+        return derived(details, (self.name, 'metrics', spec.key), build)
+
+    # Top or bottom authorities of the selection for one metric of one
+    # budget line
+    def show_ranking(self, details, tables, provinces, districts, month, year):
+        titles = [spec.title for spec in self.tables]
+        position = titles.index(st.selectbox('Ranking table', titles, key=f'{self.name}_ranking_table'))
+        spec, (df, index) = self.tables[position], tables[position]
+        metrics = self.execution_metrics(details, spec, df)
+
+        label_column, metric_column, direction_column, count_column = st.columns(4)
+        label = label_column.selectbox('Budget line', metrics.labels, key=f'{self.name}_ranking_line')
+        metric = metric_column.selectbox('Metric', METRICS, key=f'{self.name}_ranking_metric')
+        direction = direction_column.radio('Show', ['Top', 'Bottom'], horizontal=True, key=f'{self.name}_ranking_direction')
+        count = count_column.number_input('Authorities', min_value=1, max_value=100, value=10, key=f'{self.name}_ranking_count')
+
+        with stage('ranking') as record:
+            selection = index.positions(year, month, provinces, districts)
+            ranked = top_n(metrics.column(metric, label), selection, int(count), largest=direction == 'Top')
+            record.measure(ranked)
+        if len(ranked) == 0:
+            st.write("No authorities with a budget for this line in the selection.")
+        else:
+            st.dataframe(ranking_frame(df, metrics, metric, label, ranked))
+
+    # Download buttons for the selected rows of every table, or with "All
+    # months of the year" for every month of the selected year, taken from
+    # the tables built from year_details(): the page's detail rows may only
+    # hold the months up to the selected one. The file is only built when a
+    # button is clicked, streaming the rows in chunks.
+    def show_export(self, tables, provinces, districts, month, year, year_details):
+        all_months = st.checkbox('All months of the year', key=f'{self.name}_export_all_months')
+        if all_months:
+            year_tables, _ = self.build(year_details())
+            selections = [(spec.key, df, index.year_positions(year, provinces, districts))
+                          for spec, (df, index) in zip(self.tables, year_tables)]
+        else:
+            selections = [(spec.key, df, index.positions(year, month, provinces, districts))
+                          for spec, (df, index) in zip(self.tables, tables)]
+
+        period = f'{year}' if all_months else f'{year}_{month:02d}'
+        for export_format, column in zip(available_formats(), st.columns(len(EXPORT_FORMATS))):
+            extension, mime = EXPORT_FORMATS[export_format]
+            column.download_button(
+                f'Download {export_format}',
+                data=lambda export_format=export_format: export_tables(export_format, selections),
+                file_name=f'{self.name}_{period}.{extension}',
+                mime=mime,
+                key=f'{self.name}_export_{export_format}',
+            )
+        missing = [export_format for export_format in EXPORT_FORMATS if export_format not in available_formats()]
+        if missing:
+            st.caption(f"{' and '.join(missing)} export needs "
+                       f"{' and '.join({'Excel': 'XlsxWriter', 'Parquet': 'pyarrow'}[name] for name in missing)} installed.")
+
+    # Trend of one column of one table over a range of months and years, at
+    # province, district or authority level. The table is pre-aggregated
+    # into a TimeSeriesCube once per load, so any range is one array slice.
+    # Charts with more than [reports] trend_max_series lines (50 by default)
+    # are shown as a table only.
+    def show_trend(self, details, provinces, districts, years):
+        tables, _ = self.build(details)
+        titles = [spec.title for spec in self.tables]
+        position = titles.index(st.selectbox('Table', titles, key=f'{self.name}_trend_table'))
+        spec, (df, _) = self.tables[position], tables[position]
+        value_columns = [column for column in df.columns if column not in LAYOUT_KEYS]
+
+        column = st.selectbox('Column', value_columns, key=f'{self.name}_trend_column')
+        level = st.radio('Level', list(LEVELS), horizontal=True, key=f'{self.name}_trend_level')
+        from_year_column, from_month_column, to_year_column, to_month_column = st.columns(4)
+        from_year = from_year_column.selectbox('From year', years, index=0, key=f'{self.name}_trend_from_year')
+        from_month = from_month_column.selectbox('From month', range(1, 13), index=0, key=f'{self.name}_trend_from_month')
+        to_year = to_year_column.selectbox('To year', years, index=len(years) - 1, key=f'{self.name}_trend_to_year')
+        to_month = to_month_column.selectbox('To month', range(1, 13), index=11, key=f'{self.name}_trend_to_month')
+
+        cube = derived(details, (self.name, 'trend', spec.key), lambda: TimeSeriesCube(df, value_columns))
+        series = cube.series(level, column, (from_year, from_month), (to_year, to_month), provinces, districts)
+        if series.empty or series.columns.empty:
+            st.write("No data found for the selected range.")
+            return
+        if len(series.columns) <= get_setting('reports', 'trend_max_series', 50):
+            st.line_chart(series)
+        else:
+            st.caption(f'{len(series.columns)} series are too many to chart; select a province or district, '
+                       f'or a broader level.')
+        show_table(series.reset_index(), key='trend')
+
+
+# load_details for the page. A query that fails or runs past its timeout is
+# reported on the page, like a failed connection check, and the run stops.
+def load_page_details(engine, filters=None):
+    try:
+        return load_details(engine, filters)
+    except QueryTimeout as e:
+        st.error(f"The report query timed out: {e}")
+    except sqlalchemy.exc.SQLAlchemyError as e:
+        st.error(f"Error loading the report data: {e}")
+    st.stop()
+
+
+# Run a report page: connection checks and sidebar tools, the selectors, and
+# on Generate the view's tables for the selection.
+def run_report_page(view):
+    # Record the time spent in each stage of this run for the performance panel,
+    # the structured logs and the metrics endpoint ([metrics] port = 9108)
+    run = start_run(view.name)
+    metrics_port = get_setting('metrics', 'port')
+    if metrics_port:
+        start_metrics_server(metrics_port)
+
+    # Shared, pooled engine for every page and session in this process
+    try:
+        engine = get_engine()
+    except KeyError as e:
+        st.error(f"Error: Missing key '{e.args[0]}' in secrets. Check your secrets configuration.")
+        st.stop()
+
+    # Check that the database is reachable; the connection goes straight back to the pool
+    try:
+        with engine.connect():
+            pass
+        st.success("Successfully connected to the database!")
+    except sqlalchemy.exc.OperationalError as e:
+        st.error(f"OperationalError: {e}")
+    except Exception as e:
+        st.error(f"An unexpected error occurred: {e}")
+
+    # Poll for new submissions and refresh only the changed months of the cached
+    # data ([watch] interval_seconds = 60)
+    watch_interval = get_setting('watch', 'interval_seconds')
+    if watch_interval:
+        start_watcher(engine, watch_interval)
+
+    with st.sidebar.expander('Connection pool'):
+        st.json(pool_stats(engine))
+
+    # Hits, misses and coalesced loads (sessions that waited for a load another
+    # session had already started) of the shared query and derived-table caches
+    with st.sidebar.expander('Query cache'):
+        st.json({'queries': query_cache.stats(), 'derived': derived_cache.stats()})
+
+    # Cached query results are reused across reruns; this drops them so the
+    # tables below are read from the database again.
+    if st.sidebar.button('Refresh data'):
+        invalidate()
+
+    st.header('Local Government Management Information System')
+    st.markdown('Select Table to View and Filter')
+
+    # With filter pushdown enabled ([reports] filter_pushdown = true in the secrets)
+    # the selections below become bound WHERE predicates, so only the matching rows
+    # are read from the database instead of every authority, month and year.
+    filter_pushdown = get_setting('reports', 'filter_pushdown', False)
+
+    # Selector options come from an index over the distinct province / district /
+    # year / month combinations, built once per cache refresh, so the report
+    # tables are only loaded once Generate is pressed
+    filter_index = load_filter_index(engine)
+
+    province_options = filter_index.province_options()
+    province_options.insert(0, 'All Provinces')
+    selected_province = st.selectbox('Select Province', province_options)
+
+    if selected_province == 'All Provinces':
+        filtered_districts = filter_index.district_options()
+    else:
+        # Filter districts based on the selected province
+        filtered_districts = filter_index.district_options(selected_province)
+
+    district_options = list(filtered_districts)
+    district_options.insert(0, 'All Districts')
+    selected_district = st.selectbox('Select District', district_options)
+
+    selected_month = st.selectbox('Select Actual Month', filter_index.months)
+    selected_year = st.selectbox('Select Year', filter_index.years)
+
+    # Per-authority rows, or totals per district, per province or for the
+    # whole country; changing the level needs no new Generate
+    summary_level = st.radio('Summary level', ['Authority'] + list(reversed(ROLLUP_LEVELS)), horizontal=True)
+
+    provinces = None if selected_province == 'All Provinces' else [selected_province]
+    districts = None if selected_district == 'All Districts' else [selected_district]
+
+    selection = (selected_province, selected_district, selected_month, selected_year)
+    if st.button('Generate'):
+        st.session_state[f'{view.name}_generated'] = selection
+
+    # Keep showing the generated tables while the selection is unchanged, so the
+    # paging controls of the tables can rerun the page without hiding them
+    if st.session_state.get(f'{view.name}_generated') == selection:
+        # Both views read the months up to the selected one, so switching
+        # between the pages reuses the same cached detail rows
+        if filter_pushdown:
+            filters = report_filters(selected_province, selected_district, selected_year, selected_month, upto_month=True)
+        else:
+            filters = None
+
+        # One detail query feeds all three tables of both views
+        details = load_page_details(engine, filters)
+
+        tables, invalid_months = view.build(details)
+        if invalid_months:
+            st.warning(f'{invalid_months} detail rows with a month outside 1-12 were skipped.')
+
+        # Summary rows cover whole districts, provinces or the whole country,
+        # so with pushdown on they come from the selected year and months of
+        # every province and district, and do not depend on the selection
+        if summary_level != 'Authority' and filters:
+            summary_filters = report_filters(year=selected_year, month=selected_month, upto_month=True)
+            summary_details = load_page_details(engine, summary_filters)
+            summary_tables, _ = view.build(summary_details)
+            view.display(summary_details, summary_tables, provinces, districts, selected_month, selected_year, summary_level)
+        else:
+            view.display(details, tables, provinces, districts, selected_month, selected_year, summary_level)
+
+        # Execution rate, variance and pace rankings of the authorities in the selection
+        if st.checkbox('Show rankings'):
+            view.show_ranking(details, tables, provinces, districts, selected_month, selected_year)
+
+        # Bulk export of the selected rows. With pushdown on, a whole-year
+        # export reads the selected year without the month predicate
+        if filters:
+            year_filters = report_filters(selected_province, selected_district, selected_year)
+            year_details = lambda: load_page_details(engine, year_filters)
+        else:
+            year_details = lambda: details
+        with st.expander('Export'):
+            view.show_export(tables, provinces, districts, selected_month, selected_year, year_details)
+
+    # Range mode: a trend across months and years for the selected province
+    # and district. It reads every month, so it uses the unfiltered detail rows
+    if st.checkbox('Show trend over a range'):
+        view.show_trend(load_page_details(engine), provinces, districts, filter_index.years)
+
+    # Optional performance panel with the stages recorded during this run
+    if st.sidebar.checkbox('Show performance panel'):
+        if run.records:
+            st.sidebar.dataframe(run.to_frame(), hide_index=True)
+        else:
+            st.sidebar.caption('Nothing was loaded or rendered in this run.')
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+# Summary levels above the per-authority rows, broadest first, with the
+# columns each level is grouped by
+ROLLUP_LEVELS = {
+    'National': [],
+    'Province': ['province_name'],
+    'District': ['province_name', 'district_name'],
+}
+
+
+class Rollup:
+    # Sums of every value column of a report table per year and month at
+    # district, province and national level, computed once per load. Summary
+    # rows for a selection are then a lookup in a sorted index instead of an
+    # aggregation per request. Year-to-date columns roll up the same way,
+    # since the sum of running totals is the running total of the sums.
+
+    @timed_stage('rollup')
+    def __init__(self, df, value_columns):
+        self.value_columns = list(value_columns)
+        self.levels = {}
+        for level, keys in ROLLUP_LEVELS.items():
+            sums = df.groupby(['year', 'month'] + keys, observed=True)[self.value_columns].sum()
+            self.levels[level] = sums.sort_index()
+
+    # Summary rows of one level for a year and month, restricted to the given
+    # provinces and districts (collections of names, or None for all of
+    # them), laid out like the report tables: month, year, the level's name
+    # columns, then the value columns.
+    def lookup(self, level, year, month, provinces=None, districts=None):
+        keys = ROLLUP_LEVELS[level]
+        try:
+            rows = self.levels[level].loc[(year, month)]
+        except KeyError:
+            return pd.DataFrame(columns=['month', 'year'] + keys + self.value_columns)
+
+        if not keys:
+            rows = rows.to_frame().T
+        else:
+            rows = rows.reset_index()
+            if provinces is not None:
+                rows = rows[rows['province_name'].isin(provinces)]
+            if districts is not None and 'district_name' in keys:
+                rows = rows[rows['district_name'].isin(districts)]
+        rows = rows.reset_index(drop=True)
+        rows.insert(0, 'month', month)
+        rows.insert(1, 'year', year)
+        return rows[['month', 'year'] + keys + self.value_columns]
@@ -0,0 +1,170 @@
+import argparse
+
+import pandas as pd
+from sqlalchemy import Column, Float, Index, Integer, MetaData, String, Table, delete, select, tuple_
+
+from logomis.queries import (
+    actual_fingerprint_query,
+    annual_fingerprint_query,
+    bound_query,
+    details_query,
+    where_clause,
+    with_timeout,
+)
+
+# Materialized copy of the long-format detail rows behind the report pages,
+# kept per year and month. The pages read it with an indexed lookup instead
+# of re-running the detail join over all history. Refresh it with
+#
+#   python -m logomis.snapshot
+#
+# from cron or after the monthly submission deadline; only months whose
+# actuals (or whose year's annual budgets) changed are rebuilt.
+metadata = MetaData()
+
+snapshot_table = Table(
+    'report_detail_snapshots', metadata,
+    Column('name', String(255), nullable=False),
+    Column('province_name', String(255), nullable=False),
+    Column('district_name', String(255), nullable=False),
+    Column('month', Integer, nullable=False),
+    Column('year', Integer, nullable=False),
+    Column('revenue_id', Integer),
+    Column('expenditure_id', Integer),
+    Column('budget_amount', Float(precision=53)),
+    Column('actual_amount', Float(precision=53)),
+    Index('idx_report_detail_snapshots_year_month', 'year', 'month', 'province_name', 'district_name'),
+)
+
+# Fingerprint each (year, month) partition was last built from
+snapshot_state_table = Table(
+    'report_snapshot_state', metadata,
+    Column('year', Integer, primary_key=True),
+    Column('month', Integer, primary_key=True),
+    Column('fingerprint', String(255), nullable=False),
+)
+
+SNAPSHOT_COLUMNS = ['name', 'province_name', 'district_name', 'month', 'year',
+                    'revenue_id', 'expenditure_id', 'budget_amount', 'actual_amount']
+
+_snapshot_filter_columns = {
+    'year': 'year',
+    'month': 'month',
+    'provinces': 'province_name',
+    'districts': 'district_name',
+}
+
+
+_snapshot_kind_predicates = {
+    'revenue': 'revenue_id IS NOT NULL',
+    'expenditure': 'expenditure_id IS NOT NULL',
+}
+
+
+# Snapshot rows for the given filters, in the same shape as details_query.
+# Returns (query, params) ready for read_frame.
+def snapshot_details_query(filters=None, kind=None, timeout_seconds=None):
+    predicates = [_snapshot_kind_predicates[kind]] if kind else []
+    where, params, expanding = where_clause(filters or {}, predicates, columns=_snapshot_filter_columns)
+    sql = with_timeout(f"SELECT {', '.join(SNAPSHOT_COLUMNS)} FROM {snapshot_table.name} {where}", timeout_seconds)
+    return bound_query(sql, params, expanding)
+
+
+# Data version of the snapshot for the on-disk frame cache: the fingerprints
+# its partitions were last built from.
+snapshot_version_query = f'SELECT year, month, fingerprint FROM {snapshot_state_table.name} ORDER BY year, month'
+
+
+# Current fingerprint of the actuals of every (year, month)
+def actual_fingerprints(engine):
+    actual = pd.read_sql_query(actual_fingerprint_query, engine)
+    return {
+        (int(row.year), int(row.month)): f'{row.detail_count}:{row.max_detail_id}:{row.amount_total}'
+        for row in actual.itertuples(index=False)
+    }
+
+
+# Current fingerprint of the annual budgets of every year
+def annual_fingerprints(engine):
+    annual = pd.read_sql_query(annual_fingerprint_query, engine)
+    return {
+        int(row.year): f'{row.detail_count}:{row.max_detail_id}:{row.amount_total}'
+        for row in annual.itertuples(index=False)
+    }
+
+
+# Current fingerprint of every (year, month) of actuals, including the
+# year's annual budgets. Changes to a year's annual budgets change the
+# fingerprint of all its months, since the snapshot copies budget amounts
+# onto every monthly row.
+def current_fingerprints(engine):
+    annual = annual_fingerprints(engine)
+    return {
+        (year, month): f'{fingerprint}|{annual.get(year, "")}'
+        for (year, month), fingerprint in actual_fingerprints(engine).items()
+    }
+
+
+def stored_fingerprints(connection):
+    rows = connection.execute(select(snapshot_state_table))
+    return {(row.year, row.month): row.fingerprint for row in rows}
+
+
+# Bring the snapshot up to date. Partitions whose fingerprint changed are
+# rebuilt, partitions that no longer exist are dropped, and everything else is
+# left untouched. With full=True every partition is rebuilt. Returns the
+# (year, month) partitions that were rebuilt and removed.
+def refresh_snapshots(engine, full=False):
+    metadata.create_all(engine, checkfirst=True)
+    current = current_fingerprints(engine)
+
+    with engine.begin() as connection:
+        stored = stored_fingerprints(connection)
+        if full:
+            changed = sorted(current)
+        else:
+            changed = sorted(key for key, fingerprint in current.items() if stored.get(key) != fingerprint)
+        removed = sorted(key for key in stored if key not in current)
+
+        stale = changed + removed
+        if stale:
+            for table in (snapshot_table, snapshot_state_table):
+                connection.execute(delete(table).where(tuple_(table.c.year, table.c.month).in_(stale)))
+
+        for year in sorted({year for year, month in changed}):
+            months = [month for partition_year, month in changed if partition_year == year]
+            query, params = details_query({'year': year, 'months': months})
+            rows = pd.read_sql_query(query, connection, params=params)
+            rows[SNAPSHOT_COLUMNS].to_sql(snapshot_table.name, connection, if_exists='append',
+                                          index=False, chunksize=1000)
+
+        if changed:
+            connection.execute(snapshot_state_table.insert(), [
+                {'year': year, 'month': month, 'fingerprint': current[(year, month)]}
+                for year, month in changed
+            ])
+
+    return changed, removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Refresh the materialized report snapshots.')
+    parser.add_argument('--full', action='store_true', help='rebuild every month, not only changed ones')
+    parser.add_argument('--url', help='database URL; defaults to the Streamlit secrets connection')
+    args = parser.parse_args(argv)
+
+    if args.url:
+        from logomis.db import create_pooled_engine
+        engine = create_pooled_engine(args.url)
+    else:
+        from logomis.db import get_engine
+        engine = get_engine()
+
+    changed, removed = refresh_snapshots(engine, full=args.full)
+    print(f'Rebuilt {len(changed)} month(s), removed {len(removed)}')
+    for year, month in changed:
+        print(f'  {year}-{month:02d}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,85 @@
+import glob
+import hashlib
+import logging
+import os
+import tempfile
+
+try:
+    import pyarrow.feather as feather
+except ImportError:  # optional: without pyarrow the on-disk cache is off
+    feather = None
+
+from logomis.timing import stage
+
+logger = logging.getLogger(__name__)
+
+
+def _digest(value):
+    return hashlib.sha1(repr(value).encode('utf-8')).hexdigest()[:16]
+
+
+# Frames kept on local disk as uncompressed Arrow IPC (Feather v2) files, so
+# they survive Streamlit restarts and are shared by every worker on the host.
+# Each file is named after the cache key and the data version it was loaded
+# at; a cold worker whose version query matches memory-maps the file instead
+# of re-running the detail query. Categorical, small-integer and nullable
+# columns round-trip unchanged through the pandas metadata Arrow stores.
+class FrameStore:
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, key, version):
+        return os.path.join(self.directory, f'{_digest(key)}-{_digest(version)}.arrow')
+
+    # The frame stored for key at this data version, or None
+    def load(self, key, version):
+        path = self.path(key, version)
+        if not os.path.exists(path):
+            return None
+        try:
+            with stage('disk cache read') as record:
+                df = feather.read_table(path, memory_map=True).to_pandas()
+                record.measure(df)
+        except Exception:
+            logger.warning('Ignoring unreadable cache file %s', path, exc_info=True)
+            return None
+        return df
+
+    # Write the frame for key at this data version and drop the files of
+    # older versions. The file is written under a temporary name and renamed
+    # into place, so concurrent readers never see a partial file.
+    def save(self, key, version, df):
+        path = self.path(key, version)
+        try:
+            with stage('disk cache write') as record:
+                fd, partial = tempfile.mkstemp(dir=self.directory, suffix='.partial')
+                os.close(fd)
+                try:
+                    feather.write_feather(df, partial, compression='uncompressed')
+                    os.replace(partial, path)
+                finally:
+                    if os.path.exists(partial):
+                        os.remove(partial)
+                record.measure(df)
+        except Exception:
+            logger.warning('Could not write cache file %s', path, exc_info=True)
+            return
+        for old in glob.glob(os.path.join(self.directory, f'{_digest(key)}-*.arrow')):
+            if old != path:
+                os.remove(old)
+
+    def clear(self):
+        for path in glob.glob(os.path.join(self.directory, '*.arrow')):
+            os.remove(path)
+
+
+# The store configured by [disk_cache] path, or None when it is not set or
+# pyarrow is not installed.
+def open_store(directory):
+    if not directory:
+        return None
+    if feather is None:
+        logger.warning('[disk_cache] path is set but pyarrow is not installed; the on-disk cache is off')
+        return None
+    return FrameStore(directory)
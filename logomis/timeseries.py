@@ -0,0 +1,91 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+# Entity columns of each level a trend can be shown at, broadest first
+LEVELS = {
+    'Province': ['province_name'],
+    'District': ['province_name', 'district_name'],
+    'Authority': ['province_name', 'district_name', 'name'],
+}
+
+
+def period_label(period, first_year):
+    year, month = divmod(period, 12)
+    return f'{first_year + year}-{month + 1:02d}'
+
+
+class TimeSeriesCube:
+    # Monthly values of a report table pre-aggregated per level into dense
+    # [entity, period] arrays, where period counts months from January of
+    # the first year. A trend over any range of months and years is then a
+    # slice of one array instead of one page rerun per month. Months with no
+    # rows for an entity are NaN.
+    #
+    # Only the charted columns are aggregated: the entities of a level and
+    # each (level, column) array are built the first time they are asked
+    # for and kept for later lookups.
+
+    def __init__(self, df, columns):
+        self.df = df
+        self.columns = list(columns)
+        self.first_year = int(df['year'].min()) if len(df) else 0
+        last_year = int(df['year'].max()) if len(df) else -1
+        self.period_count = (last_year - self.first_year + 1) * 12
+        self.periods = ((df['year'].astype('int32') - self.first_year) * 12 + df['month'].astype('int32') - 1).to_numpy()
+        self.levels = {}
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def period(self, year, month):
+        return (year - self.first_year) * 12 + month - 1
+
+    # The entities of a level, the [entity, period] cell of each row and
+    # which cells have rows
+    def level(self, level):
+        with self._lock:
+            if level not in self.levels:
+                grouped = self.df.groupby(LEVELS[level], observed=True, sort=True)
+                entities = grouped.size().index.to_frame(index=False)
+                cells = grouped.ngroup().to_numpy() * self.period_count + self.periods
+                filled = np.bincount(cells, minlength=len(entities) * self.period_count) > 0
+                self.levels[level] = (entities, cells, filled)
+            return self.levels[level]
+
+    # [entity, period] sums of one column at one level
+    @timed_stage('trend cube')
+    def column_values(self, level, column):
+        entities, cells, filled = self.level(level)
+        with self._lock:
+            if (level, column) not in self.values:
+                weights = np.nan_to_num(self.df[column].to_numpy(dtype='float64'))
+                sums = np.bincount(cells, weights=weights, minlength=len(entities) * self.period_count)
+                sums[~filled] = np.nan
+                self.values[(level, column)] = sums.reshape(len(entities), self.period_count)
+            return self.values[(level, column)]
+
+    # One column from start to end (inclusive (year, month) pairs) with one
+    # series per entity of the level, restricted to the given provinces and
+    # districts (collections of names, or None for all of them). Returns a
+    # frame indexed by 'YYYY-MM' labels.
+    @timed_stage('trend lookup')
+    def series(self, level, column, start, end, provinces=None, districts=None):
+        entities, _, _ = self.level(level)
+        values = self.column_values(level, column)
+        first = max(self.period(*start), 0)
+        last = min(self.period(*end), self.period_count - 1)
+
+        mask = np.ones(len(entities), dtype=bool)
+        if provinces is not None:
+            mask &= entities['province_name'].isin(provinces).to_numpy()
+        if districts is not None and 'district_name' in entities:
+            mask &= entities['district_name'].isin(districts).to_numpy()
+
+        block = values[mask, first:last + 1]
+        names = entities[mask].astype(str).agg(' / '.join, axis=1) if len(entities.columns) > 1 \
+            else entities[mask].iloc[:, 0].astype(str)
+        labels = [period_label(period, self.first_year) for period in range(first, last + 1)]
+        return pd.DataFrame(block.T, index=pd.Index(labels, name='period'), columns=list(names))
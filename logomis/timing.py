@@ -0,0 +1,198 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+logger = logging.getLogger('logomis.timing')
+
+# Stages recorded during the current page run. Streamlit runs each session's
+# script in its own thread, so every session sees its own run.
+_current_run = contextvars.ContextVar('logomis_timing_run', default=None)
+
+# Process-wide totals per (page, stage) for the metrics endpoint
+_totals = {}
+_totals_lock = threading.Lock()
+
+# Extra gauges for the metrics endpoint, e.g. cache and pool statistics
+_collectors = []
+
+_server = None
+_server_started = False
+_server_lock = threading.Lock()
+
+
+class StageRecord:
+    def __init__(self, page, stage):
+        self.page = page
+        self.stage = stage
+        self.seconds = None
+        self.rows = None
+        self.bytes = None
+
+    # Record the size of a stage's result: a DataFrame, or a row count
+    def measure(self, result):
+        if isinstance(result, (pd.DataFrame, pd.Series)):
+            self.rows = len(result)
+            self.bytes = int(result.memory_usage(index=True, deep=True).sum()) if isinstance(result, pd.DataFrame) \
+                else int(result.memory_usage(index=True, deep=True))
+        elif isinstance(result, int):
+            self.rows = result
+        elif hasattr(result, '__len__'):
+            self.rows = len(result)
+        return result
+
+    def as_dict(self):
+        return {
+            'page': self.page,
+            'stage': self.stage,
+            'seconds': self.seconds,
+            'rows': self.rows,
+            'bytes': self.bytes,
+        }
+
+
+class Run:
+    # Stages recorded during one page run, for the performance panel
+
+    def __init__(self, page):
+        self.page = page
+        self.records = []
+
+    def to_frame(self):
+        return pd.DataFrame([record.as_dict() for record in self.records],
+                            columns=['stage', 'seconds', 'rows', 'bytes'])
+
+
+# Start recording the stages of a page run. Call once at the top of a page.
+def start_run(page):
+    run = Run(page)
+    _current_run.set(run)
+    return run
+
+
+def _finish(record):
+    run = _current_run.get()
+    if run is not None:
+        run.records.append(record)
+
+    with _totals_lock:
+        totals = _totals.setdefault((record.page, record.stage),
+                                    {'calls': 0, 'seconds': 0.0, 'rows': 0, 'bytes': 0, 'last_seconds': 0.0})
+        totals['calls'] += 1
+        totals['seconds'] += record.seconds
+        totals['last_seconds'] = record.seconds
+        totals['rows'] += record.rows or 0
+        totals['bytes'] += record.bytes or 0
+
+    logger.info(json.dumps({'event': 'stage', **record.as_dict()}))
+
+
+# Time a block of code as one stage of the current page run:
+#
+#   with stage('query') as record:
+#       df = ...
+#       record.measure(df)
+@contextmanager
+def stage(name):
+    run = _current_run.get()
+    record = StageRecord(run.page if run is not None else None, name)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        record.seconds = time.perf_counter() - start
+        _finish(record)
+
+
+# Decorator form of stage() that also measures the function's result
+def timed_stage(name):
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name) as record:
+                return record.measure(fn(*args, **kwargs))
+        return wrapper
+    return decorator
+
+
+# Register a function returning {metric_name: value} gauges to include in the
+# metrics endpoint
+def register_collector(collector):
+    if collector not in _collectors:
+        _collectors.append(collector)
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+# Stage totals and registered gauges in the Prometheus text exposition format
+def prometheus_text():
+    with _totals_lock:
+        totals = {key: dict(value) for key, value in _totals.items()}
+
+    metrics = [
+        ('logomis_stage_calls_total', 'counter', 'Number of times a stage ran.', 'calls'),
+        ('logomis_stage_seconds_total', 'counter', 'Total time spent in a stage.', 'seconds'),
+        ('logomis_stage_rows_total', 'counter', 'Rows produced by a stage.', 'rows'),
+        ('logomis_stage_bytes_total', 'counter', 'Bytes produced by a stage.', 'bytes'),
+        ('logomis_stage_last_seconds', 'gauge', 'Duration of the latest run of a stage.', 'last_seconds'),
+    ]
+    lines = []
+    for metric, kind, help_text, field in metrics:
+        lines.append(f'# HELP {metric} {help_text}')
+        lines.append(f'# TYPE {metric} {kind}')
+        for (page, stage_name), values in sorted(totals.items(), key=lambda item: (str(item[0][0]), item[0][1])):
+            lines.append(f'{metric}{{page="{_label(page or "")}",stage="{_label(stage_name)}"}} {values[field]}')
+
+    for collector in _collectors:
+        try:
+            gauges = collector()
+        except Exception:
+            logger.exception('Metrics collector failed')
+            continue
+        for name, value in gauges.items():
+            lines.append(f'# TYPE {name} gauge')
+            lines.append(f'{name} {value}')
+
+    return '\n'.join(lines) + '\n'
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = prometheus_text().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+# Serve prometheus_text() at http://<host>:<port>/metrics from a background
+# thread. Safe to call on every rerun; the server is only started once per
+# process. When the port is taken, e.g. by another Streamlit worker on the
+# same host, the error is logged and this process runs without an endpoint.
+def start_metrics_server(port, host='0.0.0.0'):
+    global _server, _server_started
+    with _server_lock:
+        if not _server_started:
+            _server_started = True
+            try:
+                _server = ThreadingHTTPServer((host, int(port)), _MetricsHandler)
+            except OSError:
+                logger.warning('Metrics server not started on port %s', port, exc_info=True)
+                return None
+            threading.Thread(target=_server.serve_forever, name='logomis-metrics', daemon=True).start()
+    return _server
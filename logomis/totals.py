@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+
+# 0/1 membership matrix of the category group registry: one row per category
+# and one column per group, 1 where the category belongs to the group.
+def group_matrix(categories, groups, dtype='float64'):
+    matrix = np.zeros((len(categories), len(groups)), dtype=dtype)
+    for row, category in enumerate(categories):
+        if category.group in groups:
+            matrix[row, groups.index(category.group)] = 1
+    return matrix
+
+
+# Budget and actual totals of each group in `totals` (logomis.report.Total),
+# computed as one matrix product: the budget and actual columns are taken as
+# a single (rows, 2, categories) block and multiplied by the group membership
+# matrix, instead of adding the columns one Series at a time. Returns the
+# total columns as a frame aligned with table, budget totals first.
+@timed_stage('group totals')
+def group_totals(table, categories, totals, actual_suffix=''):
+    groups = [total.group for total in totals]
+    columns = [category.budget for category in categories] + [category.actual + actual_suffix for category in categories]
+    amounts = table[columns].to_numpy().reshape(len(table), 2, len(categories))
+    sums = amounts @ group_matrix(categories, groups, amounts.dtype)
+    names = [total.budget for total in totals] + [total.actual for total in totals]
+    return pd.DataFrame(sums.reshape(len(table), 2 * len(groups)), index=table.index, columns=names)
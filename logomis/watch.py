@@ -0,0 +1,107 @@
+import logging
+import threading
+
+from logomis.config import get_setting
+from logomis.data import derived_cache, query_cache, refresh_partitions
+from logomis.budgets import budget_cache
+from logomis.snapshot import actual_fingerprints, annual_fingerprints, stored_fingerprints
+from logomis.timing import register_collector, stage
+
+logger = logging.getLogger(__name__)
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+
+# Fingerprints of what the report pages read, as ({(year, month):
+# fingerprint} of the actuals, {year: fingerprint} of the annual budgets).
+# When the pages read the snapshot these are the partition fingerprints in
+# its state table and no budget fingerprints, since snapshot rows carry
+# their budgets.
+def partition_fingerprints(engine, source='live'):
+    if source == 'snapshot':
+        with engine.connect() as connection:
+            return stored_fingerprints(connection), {}
+    return actual_fingerprints(engine), annual_fingerprints(engine)
+
+
+# Keys (partitions or years) that were added, removed or changed between two
+# fingerprint sets
+def changed_partitions(previous, current):
+    return {key for key in previous.keys() | current.keys() if previous.get(key) != current.get(key)}
+
+
+class ChangeWatcher:
+    # Polls the partition fingerprints every interval seconds and refreshes
+    # only the changed (year, month) partitions of the cached detail frames,
+    # so the database is read again only when submissions actually arrive.
+    # A revised annual budget only re-reads that year's budgets.
+
+    def __init__(self, engine, interval, source='live'):
+        self.engine = engine
+        self.interval = interval
+        self.source = source
+        self.fingerprints = None
+        self.polls = 0
+        self.changes = 0
+        self.budget_changes = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    # Compare the fingerprints with the previous poll and refresh what
+    # changed. The first poll only records the baseline. Returns the changed
+    # partitions.
+    def poll(self):
+        with stage('change poll'):
+            current = partition_fingerprints(self.engine, self.source)
+        if self.fingerprints is None:
+            changed, budget_years = set(), set()
+        else:
+            changed = changed_partitions(self.fingerprints[0], current[0])
+            budget_years = changed_partitions(self.fingerprints[1], current[1])
+        if changed or budget_years:
+            logger.info('Partitions changed: %s; budget years changed: %s', sorted(changed), sorted(budget_years))
+            refresh_partitions(self.engine, changed, self.source, budget_years)
+            self.changes += len(changed)
+            self.budget_changes += len(budget_years)
+        self.fingerprints = current
+        self.polls += 1
+        return changed
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.poll()
+            except Exception:
+                logger.warning('Change poll failed', exc_info=True)
+
+    # Take the baseline now, so frames loaded after this call are checked
+    # against it, then keep polling on a daemon thread
+    def start(self):
+        self.poll()
+        self._thread = threading.Thread(target=self._run, name='logomis-watch', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+
+
+# Start the process-wide watcher once; later calls return the running one.
+# The watcher refreshes cached frames when their partitions change, so from
+# then on the caches keep their entries instead of expiring and reloading
+# them on a timer.
+def start_watcher(engine, interval, source=None):
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            for cache in (query_cache, derived_cache, budget_cache):
+                cache.set_ttl(None)
+            watcher = ChangeWatcher(engine, float(interval), source or get_setting('reports', 'source', 'live'))
+            register_collector(lambda: {
+                'logomis_watch_polls_total': watcher.polls,
+                'logomis_watch_changed_partitions_total': watcher.changes,
+                'logomis_watch_changed_budget_years_total': watcher.budget_changes,
+            })
+            _watcher = watcher.start()
+    return _watcher
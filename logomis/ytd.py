@@ -0,0 +1,23 @@
+import pandas as pd
+
+from logomis.timing import timed_stage
+
+# Cumulative "upto this month" totals restart for each authority and year
+YTD_GROUP_COLUMNS = ['name', 'province_name', 'district_name', 'year']
+
+
+# Add a cumulative (year to date) copy of each column, named column + suffix.
+# All columns are summed in one grouped pass, so the group keys are hashed
+# once instead of once per column. The frame must already be sorted by the
+# group columns and month.
+#
+# After a partition refresh the columns are recomputed from scratch rather
+# than appended month by month: the report tables they are added to have to
+# be pivoted again anyway, and that pivot costs about twenty times this pass
+# (see python -m bench.run).
+@timed_stage('cumsum')
+def add_ytd_columns(df, columns, suffix):
+    cumulative = df.groupby(YTD_GROUP_COLUMNS, sort=False, observed=True)[columns].cumsum()
+    cumulative.columns = [column + suffix for column in columns]
+    return pd.concat([df, cumulative], axis=1)
+
@@ -0,0 +1,44 @@
+-- Indexes for the report pages when filters are pushed down into SQL
+-- ([reports] filter_pushdown = true in the Streamlit secrets).
+--
+-- The report queries filter actual_budgets on year and month, walk
+-- local_authorities -> districts -> provinces for the province/district
+-- selectors, and join the detail and annual budget tables by their parent id
+-- plus revenue_id / expenditure_id.
+--
+-- Apply with:
+--   mysql -h <host> -u <user> -p <database> < migrations/001_report_indexes.sql
+
+CREATE INDEX idx_actual_budgets_year_month_la
+    ON actual_budgets (year, month, local_authority_id);
+
+CREATE INDEX idx_actual_budget_details_budget_revenue
+    ON actual_budget_details (actual_budget_id, revenue_id);
+
+CREATE INDEX idx_actual_budget_details_budget_expenditure
+    ON actual_budget_details (actual_budget_id, expenditure_id);
+
+CREATE INDEX idx_annual_budgets_la_year
+    ON annual_budgets (local_authority_id, year);
+
+CREATE INDEX idx_annual_budget_details_budget_revenue
+    ON annual_budget_details (annual_budget_id, revenue_id);
+
+CREATE INDEX idx_annual_budget_details_budget_expenditure
+    ON annual_budget_details (annual_budget_id, expenditure_id);
+
+CREATE INDEX idx_local_authorities_district
+    ON local_authorities (district_id);
+
+CREATE INDEX idx_districts_province
+    ON districts (province_id);
+
+-- Rollback:
+--   DROP INDEX idx_actual_budgets_year_month_la ON actual_budgets;
+--   DROP INDEX idx_actual_budget_details_budget_revenue ON actual_budget_details;
+--   DROP INDEX idx_actual_budget_details_budget_expenditure ON actual_budget_details;
+--   DROP INDEX idx_annual_budgets_la_year ON annual_budgets;
+--   DROP INDEX idx_annual_budget_details_budget_revenue ON annual_budget_details;
+--   DROP INDEX idx_annual_budget_details_budget_expenditure ON annual_budget_details;
+--   DROP INDEX idx_local_authorities_district ON local_authorities;
+--   DROP INDEX idx_districts_province ON districts;
@@ -0,0 +1,12 @@
+-- Index for the year-keyed annual budget cache (logomis.budgets), which reads
+-- the annual budgets of whole years with annual_budgets.year IN (...) instead
+-- of joining them onto every monthly actuals row.
+--
+-- Apply with:
+--   mysql -h <host> -u <user> -p <database> < migrations/002_annual_budgets_year_index.sql
+
+CREATE INDEX idx_annual_budgets_year_la
+    ON annual_budgets (year, local_authority_id);
+
+-- Rollback:
+--   DROP INDEX idx_annual_budgets_year_la ON annual_budgets;
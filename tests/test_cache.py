@@ -0,0 +1,146 @@
+import threading
+
+import pytest
+
+from logomis.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+# Start `count` threads calling get_or_load(key, loader) and return their
+# results (or exceptions) once the loader has been entered and released
+def load_concurrently(cache, key, loader, count, release):
+    results = [None] * count
+
+    def call(index):
+        try:
+            results[index] = cache.get_or_load(key, loader)
+        except Exception as e:
+            results[index] = e
+
+    threads = [threading.Thread(target=call, args=(index,)) for index in range(count)]
+    for thread in threads:
+        thread.start()
+    while cache.stats()['coalesced'] < count - 1:
+        threading.Event().wait(0.001)
+    release()
+    for thread in threads:
+        thread.join(timeout=5)
+    return results
+
+
+def test_concurrent_loads_are_coalesced():
+    cache = TTLCache()
+    release = threading.Event()
+    calls = []
+
+    def loader():
+        calls.append(1)
+        release.wait(5)
+        return 'value'
+
+    results = load_concurrently(cache, 'key', loader, 8, release.set)
+
+    assert results == ['value'] * 8
+    assert len(calls) == 1
+    assert cache.stats()['coalesced'] == 7
+    assert cache.stats()['in_flight'] == 0
+    assert cache.get('key') == 'value'
+
+
+def test_load_errors_reach_every_waiter_and_are_not_cached():
+    cache = TTLCache()
+    release = threading.Event()
+
+    def loader():
+        release.wait(5)
+        raise ValueError('query failed')
+
+    results = load_concurrently(cache, 'key', loader, 4, release.set)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert len(cache) == 0
+    assert cache.get_or_load('key', lambda: 'retried') == 'retried'
+
+
+def test_invalidate_during_load_skips_storing_the_result():
+    cache = TTLCache()
+
+    def loader():
+        cache.invalidate()
+        return 'before the change'
+
+    assert cache.get_or_load('key', loader) == 'before the change'
+    assert cache.get('key') is None
+    assert cache.get_or_load('key', lambda: 'after the change') == 'after the change'
+    assert cache.get('key') == 'after the change'
+
+
+def test_entries_expire_after_the_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set('key', 'value')
+
+    clock.now = 9.9
+    assert cache.get('key') == 'value'
+    clock.now = 10
+    assert cache.get('key') is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (1, 3)
+    assert cache.stats()['evictions'] == 1
+
+
+@pytest.mark.parametrize('predicate', [None, lambda key: key == 'key'])
+def test_expire_in_flight_counts_matching_loads(predicate):
+    cache = TTLCache()
+    expired = []
+
+    def loader():
+        expired.append(cache.expire_in_flight(predicate))
+        return 'value'
+
+    cache.get_or_load('key', loader)
+
+    assert expired == [1]
+    assert len(cache) == 0
+
+
+def test_set_ttl_none_keeps_unexpired_entries():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=10, clock=clock)
+    cache.set('expired', 'value')
+    clock.now = 25
+    cache.set('kept', 'value')
+    clock.now = 30
+
+    cache.set_ttl(None)
+    cache.set('added', 'value')
+    clock.now = 10 ** 9
+
+    assert cache.get('expired') is None
+    assert cache.get('kept') == 'value'
+    assert cache.get('added') == 'value'
+
+
+def test_zero_ttl_means_no_expiry():
+    clock = FakeClock()
+    cache = TTLCache(ttl_seconds=0, clock=clock)
+    cache.set('key', 'value')
+    clock.now = 10 ** 9
+
+    assert cache.get('key') == 'value'
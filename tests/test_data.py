@@ -0,0 +1,116 @@
+import pandas as pd
+import pytest
+from sqlalchemy import create_engine, event, text
+
+from bench.synthetic import generate
+from logomis.budgets import load_budgets, merge_budgets
+from logomis.data import invalidate, load_details, read_frame, refresh_partitions
+from logomis.queries import actuals_query, details_query
+from logomis.dtypes import compact_details, concat_compact
+from logomis.watch import ChangeWatcher
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{generate(str(tmp_path / 'lg.db'), authorities=6, years=1, first_year=2022)}")
+    yield engine
+    engine.dispose()
+
+
+def test_concat_compact_skips_empty_frames():
+    rows = compact_details(pd.DataFrame({'name': ['A', 'B'], 'month': [1, 2], 'actual_amount': [1.0, 2.0]}))
+    empty = compact_details(pd.DataFrame(columns=['name', 'month', 'actual_amount']))
+
+    combined = concat_compact([rows, empty])
+
+    assert combined['name'].tolist() == ['A', 'B']
+    assert isinstance(combined['name'].dtype, pd.CategoricalDtype)
+    assert len(concat_compact([empty, empty])) == 0
+
+
+# With filter pushdown a month can have revenue rows and no expenditure rows,
+# so one of the two concurrent halves comes back empty
+def test_load_details_with_an_empty_half(engine):
+    with engine.begin() as connection:
+        connection.execute(text(
+            'DELETE FROM actual_budget_details WHERE expenditure_id IS NOT NULL AND actual_budget_id IN '
+            '(SELECT id FROM actual_budgets WHERE year = 2022 AND month = 3)'
+        ))
+
+    details = load_details(engine, {'year': 2022, 'month': 3, 'upto_month': False})
+
+    assert len(details) > 0
+    assert details['revenue_id'].notna().all()
+    assert isinstance(details['name'].dtype, pd.CategoricalDtype)
+
+
+# Rows in a fixed order with plain values, for comparing frames that were
+# spliced together with freshly loaded ones
+def sorted_rows(details):
+    rows = details.astype({column: str for column in ['name', 'province_name', 'district_name']})
+    return rows.sort_values(['name', 'year', 'month', 'revenue_id', 'expenditure_id']).reset_index(drop=True)
+
+
+def test_refresh_partitions_matches_a_fresh_load(engine):
+    upto_may = {'year': 2022, 'month': 5, 'upto_month': True}
+    load_details(engine)
+    load_details(engine, upto_may)
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            'UPDATE actual_budget_details SET total_amount = total_amount + 1000 WHERE actual_budget_id IN '
+            '(SELECT id FROM actual_budgets WHERE year = 2022 AND month = 3)'
+        ))
+        connection.execute(text(
+            'DELETE FROM actual_budget_details WHERE revenue_id = 1 AND actual_budget_id IN '
+            '(SELECT id FROM actual_budgets WHERE year = 2022 AND month IN (5, 9))'
+        ))
+
+    assert refresh_partitions(engine, [(2022, 3), (2022, 5), (2022, 9)]) == 2
+    refreshed = [sorted_rows(load_details(engine)), sorted_rows(load_details(engine, upto_may))]
+
+    invalidate()
+    fresh = [sorted_rows(load_details(engine)), sorted_rows(load_details(engine, upto_may))]
+    for refreshed_rows, fresh_rows in zip(refreshed, fresh):
+        pd.testing.assert_frame_equal(refreshed_rows, fresh_rows)
+
+
+# A revised annual budget is merged onto the cached actuals without
+# re-reading them
+def test_budget_change_refreshes_budgets_only(engine):
+    upto_may = {'year': 2022, 'month': 5, 'upto_month': True}
+    load_details(engine)
+    load_details(engine, upto_may)
+    watcher = ChangeWatcher(engine, 60)
+    watcher.poll()
+
+    with engine.begin() as connection:
+        connection.execute(text(
+            'UPDATE annual_budget_details SET total_amount = total_amount + 1000 WHERE id IN '
+            '(SELECT id FROM annual_budget_details ORDER BY id LIMIT 3)'
+        ))
+    statements = []
+    event.listen(engine, 'before_cursor_execute', lambda *args: statements.append(args[2]))
+
+    assert watcher.poll() == set()
+    assert watcher.budget_changes == 1
+    assert not any('actual_budget_details.total_amount) AS actual_amount' in statement for statement in statements)
+    refreshed = [sorted_rows(load_details(engine)), sorted_rows(load_details(engine, upto_may))]
+
+    invalidate()
+    fresh = [sorted_rows(load_details(engine)), sorted_rows(load_details(engine, upto_may))]
+    for refreshed_rows, fresh_rows in zip(refreshed, fresh):
+        pd.testing.assert_frame_equal(refreshed_rows, fresh_rows)
+
+
+# Merging the year-keyed budgets onto the actuals gives the rows of the
+# query that joins the annual budgets in SQL
+def test_merge_budgets_matches_the_joined_query(engine):
+    query, params = actuals_query()
+    actuals = read_frame(query, engine, params, transform=compact_details)
+    merged = merge_budgets(actuals, load_budgets(engine, actuals['year'].unique()))
+
+    query, params = details_query()
+    joined = read_frame(query, engine, params, transform=compact_details)
+
+    pd.testing.assert_frame_equal(sorted_rows(merged), sorted_rows(joined))
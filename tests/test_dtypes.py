@@ -0,0 +1,18 @@
+import pandas as pd
+
+from logomis.dtypes import INVALID_MONTH, compact_details, normalize_months
+
+
+def test_invalid_months_are_dropped_and_counted():
+    details = pd.DataFrame({
+        'month': [1, 257, None, 'x', 3.5, 12, '7'],
+        'year': [2022] * 7,
+        'actual_amount': [1.0] * 7,
+    })
+
+    compact = compact_details(details)
+    rows, dropped = normalize_months(compact)
+
+    assert compact['month'].tolist() == [1, INVALID_MONTH, INVALID_MONTH, INVALID_MONTH, INVALID_MONTH, 12, 7]
+    assert rows['month'].tolist() == [1, 12, 7]
+    assert dropped == 4